@@ -7,6 +7,19 @@ from QOpenScienceFramework.compat import *
 dirname = safe_decode(os.path.dirname(__file__),
 	enc=sys.getfilesystemencoding())
 
-import QOpenScienceFramework.connection
-import QOpenScienceFramework.manager
-import QOpenScienceFramework.widgets
+# The submodules are imported when they are first accessed, so that scripts
+# that only need the connection (such as the qosf command) don't load the Qt
+# widgets. Python 2 and Python < 3.7 don't support this, and import them here.
+_submodules = ['connection', 'manager', 'widgets']
+if sys.version_info >= (3, 7):
+	import importlib
+
+	def __getattr__(name):
+		if name in _submodules:
+			return importlib.import_module(__name__ + '.' + name)
+		raise AttributeError("module {!r} has no attribute {!r}".format(
+			__name__, name))
+else:
+	import QOpenScienceFramework.connection
+	import QOpenScienceFramework.manager
+	import QOpenScienceFramework.widgets
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Daniel Schreij
+
+This module is distributed under the Apache v2.0 License.
+You should have received a copy of the Apache v2.0 License
+along with this module. If not, see <http://www.apache.org/licenses/>.
+
+An asyncio client for the OSF, for scripts and batch jobs that run without a
+display or Qt event loop. It uses the same settings.json as connection.py and
+reads the token from the file written by events.TokenFileListener, so a token
+obtained by logging in through the widgets can be reused. Many listings,
+downloads and uploads can be in progress at the same time over a single pool
+of connections:
+
+	async with AsyncClient(tokenfile='token.json') as client:
+		async for entry in client.listing(osf.api_call('repo_files', node,
+			'osfstorage')):
+			...
+		await gather((client.download(url, path) for url, path in files),
+			limit=50)
+
+This module requires Python 3.6 or higher, and aiohttp (which can be installed
+with the async extra of this package). It is kept apart from connection.py,
+which still supports Python 2. Neither of them needs Qt.
+"""
+import json
+import time
+import asyncio
+
+try:
+	import aiohttp
+except ImportError:
+	aiohttp = None
+
+from QOpenScienceFramework import connection as osf
+
+# Content types of the responses of the OSF API
+json_content_types = ['application/json', 'application/vnd.api+json']
+
+def load_token(tokenfile):
+	""" Reads the OAuth2 token stored by events.TokenFileListener
+
+	Parameters
+	----------
+	tokenfile : str
+		The path to the token file
+
+	Returns
+	-------
+	dict : the token information, containing at least access_token and
+	expires_at
+
+	Raises
+	------
+	IOError : if the token file can't be read
+	osf.TokenExpiredError : if the token has expired
+	"""
+	with open(tokenfile) as fp:
+		token = json.load(fp)
+	if token.get("expires_at", 0) <= time.time():
+		raise osf.TokenExpiredError("The supplied token has expired")
+	return token
+
+async def gather(coroutines, limit=None):
+	""" Runs coroutines concurrently, with at most limit of them in progress
+	at once, and returns their results in order. Like asyncio.gather(), the
+	first exception that occurs is raised.
+
+	Parameters
+	----------
+	coroutines : iterable
+		The coroutines to run
+	limit : int (default: None)
+		The maximum number of coroutines to run at the same time, or None for
+		no limit
+
+	Returns
+	-------
+	list : the results of the coroutines
+	"""
+	if limit is None:
+		return await asyncio.gather(*coroutines)
+	semaphore = asyncio.Semaphore(limit)
+	async def run(coroutine):
+		async with semaphore:
+			return await coroutine
+	return await asyncio.gather(*[run(coroutine) for coroutine in coroutines])
+
+class AsyncClient(object):
+	""" Performs requests to the OSF API and file servers with asyncio. Use it
+	as an asynchronous context manager, or call close() when done. """
+
+	def __init__(self, token=None, tokenfile="token.json", max_connections=100,
+		chunk_size=256*1024):
+		""" Constructor
+
+		Parameters
+		----------
+		token : dict (default: None)
+			The OAuth2 token to authenticate with. If not specified, it is read
+			from tokenfile.
+		tokenfile : str (default: 'token.json')
+			The token file written by events.TokenFileListener
+		max_connections : int (default: 100)
+			The maximum number of connections that are open at the same time
+		chunk_size : int (default: 256 KB)
+			The size of the chunks in which downloads are written to disk
+		"""
+		if aiohttp is None:
+			raise ImportError("The asyncio client requires aiohttp")
+		if token is None:
+			token = load_token(tokenfile)
+		self.token = token
+		self.max_connections = max_connections
+		self.chunk_size = chunk_size
+		self.session = None
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, exc_type, exc, tb):
+		await self.close()
+
+	def __get_session(self):
+		""" Returns the session, creating it on first use (as this has to
+		happen inside the event loop) """
+		if self.session is None:
+			connector = aiohttp.TCPConnector(limit=self.max_connections)
+			self.session = aiohttp.ClientSession(connector=connector,
+				headers={"Authorization": "Bearer {}".format(
+					self.token["access_token"])})
+		return self.session
+
+	async def close(self):
+		""" Closes all connections """
+		if not self.session is None:
+			await self.session.close()
+			self.session = None
+
+	def __check_token(self):
+		""" The counterpart of connection.token_valid() """
+		if self.token.get("expires_at", 0) <= time.time():
+			raise osf.TokenExpiredError("The supplied token has expired")
+
+	async def __handle_response(self, response):
+		""" Checks the response and returns its contents, with the same
+		semantics as connection.requires_authentication(): JSON responses are
+		returned as dicts and other successful responses as bytes, error
+		messages of the OSF are raised as OSFInvalidResponse, and an invalid
+		token as TokenExpiredError. """
+		content_type = response.headers.get("content-type", "").split(";")[0]
+		body = await response.read()
+		if content_type in json_content_types:
+			try:
+				data = json.loads(body.decode("utf-8")) if body else {}
+			except ValueError as e:
+				raise osf.OSFInvalidResponse(
+					"Could not decode response to JSON: {}".format(e))
+		else:
+			data = None
+		if response.status in (200, 201):
+			return body if data is None else data
+
+		if isinstance(data, dict) and "errors" in data:
+			try:
+				msg = data["errors"][0]["detail"]
+			except (KeyError, IndexError, TypeError):
+				raise osf.OSFInvalidResponse("An error occured, but OSF error "
+					"message could not be retrieved. Invalid format?")
+			# Check if message involves an incorrecte token response
+			if msg == "User provided an invalid OAuth2 access token":
+				raise osf.TokenExpiredError(msg)
+		# Don't print out html pages or octet stream, as this is useless
+		if not content_type in ["text/html", "application/octet-stream"]:
+			message = body.decode("utf-8", "replace")
+		else:
+			message = ""
+		raise osf.OSFInvalidResponse(
+			"Could not handle response {}: {}\nContent Type: {}\n{}".format(
+				response.status, response.reason, content_type, message))
+
+	async def request(self, method, url, **kwargs):
+		""" Performs a request and returns the contents of its response (see
+		__handle_response()). The keyword arguments are passed on to
+		aiohttp.ClientSession.request(). """
+		self.__check_token()
+		async with self.__get_session().request(method, url, **kwargs) \
+			as response:
+			return await self.__handle_response(response)
+
+	async def get(self, url, **kwargs):
+		""" Performs a GET request, see request() """
+		return await self.request("GET", url, **kwargs)
+
+	async def listing(self, url, sparse=True):
+		""" Iterates over the entries of a listing of projects or files, for
+		instance from osf.api_call('repo_files', project_id, provider),
+		retrieving the pages of the listing one by one.
+
+		Parameters
+		----------
+		url : str
+			The url of the listing
+		sparse : bool (default: True)
+			If True, only the fields of the entries that records.ItemRecord
+			uses are retrieved (see osf.listing_url())
+
+		Yields
+		------
+		dict : the JSON representation of every entry
+		"""
+		if sparse:
+			url = osf.listing_url(url)
+		while url:
+			page = await self.get(url)
+			for entry in page["data"]:
+				yield entry
+			url = page.get("links", {}).get("next")
+
+	async def download(self, url, destination):
+		""" Downloads a file, writing it to disk in chunks as it is received
+
+		Parameters
+		----------
+		url : str
+			The download link of the file
+		destination : str
+			The path to save the file to
+
+		Returns
+		-------
+		int : the number of bytes written
+		"""
+		self.__check_token()
+		written = 0
+		async with self.__get_session().get(url) as response:
+			if response.status != 200:
+				await self.__handle_response(response)
+			with open(destination, "wb") as fp:
+				async for chunk in response.content.iter_chunked(
+					self.chunk_size):
+					fp.write(chunk)
+					written += len(chunk)
+		return written
+
+	async def upload(self, url, source, name=None):
+		""" Uploads a file
+
+		Parameters
+		----------
+		url : str
+			The upload link of the folder to upload to, or of the file to
+			overwrite
+		source : str
+			The path of the file to upload
+		name : str (default: None)
+			The name of the new file in the folder. If not specified, url
+			should be the upload link of an existing file, which is replaced.
+
+		Returns
+		-------
+		dict : the JSON representation of the uploaded file
+		"""
+		params = {"kind": "file"}
+		if not name is None:
+			params["name"] = name
+		with open(source, "rb") as fp:
+			return await self.request("PUT", url, params=params, data=fp)
+
+	async def download_all(self, files, jobs=None):
+		""" Downloads several files concurrently
+
+		Parameters
+		----------
+		files : iterable
+			(url, destination) tuples
+		jobs : int (default: None)
+			The maximum number of downloads in progress at the same time. If
+			not specified, this is limited by max_connections only.
+
+		Returns
+		-------
+		list : the number of bytes written for every file
+		"""
+		return await gather((self.download(url, destination)
+			for url, destination in files), limit=jobs)
+
+	async def upload_all(self, files, jobs=None):
+		""" Uploads several files concurrently
+
+		Parameters
+		----------
+		files : iterable
+			(url, source, name) tuples, see upload()
+		jobs : int (default: None)
+			The maximum number of uploads in progress at the same time
+
+		Returns
+		-------
+		list : the JSON representations of the uploaded files
+		"""
+		return await gather((self.upload(url, source, name)
+			for url, source, name in files), limit=jobs)
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Daniel Schreij
+
+This module is distributed under the Apache v2.0 License.
+You should have received a copy of the Apache v2.0 License
+along with this module. If not, see <http://www.apache.org/licenses/>.
+
+Login through the system browser, as a lightweight alternative to
+loginwindow.LoginWindow, which requires QtWebEngine or QtWebKit. The login page
+of the OSF is opened in the default browser, which is redirected to a small
+HTTP server on the local machine once the user has logged in. The redirect uri
+registered for the app (the redirect_uri entry of connection.settings) should
+therefore be a loopback url with a fixed port, such as http://localhost:8765/.
+
+The OSF passes the token in the fragment of the redirect url, which browsers
+don't send to the server. The server therefore responds with a page that posts
+the fragment back to it.
+"""
+# Python3 compatibility
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+import webbrowser
+
+from qtpy import QtCore, QtNetwork
+from oauthlib.oauth2 import OAuth2Error
+
+# OSF connection interface
+import QOpenScienceFramework.connection as osf
+# Python 2 and 3 compatiblity settings
+from QOpenScienceFramework.compat import *
+
+# Dummy function later to be replaced for translation
+_ = lambda s: s
+
+# The page the browser is redirected to, which posts the fragment of its url
+# (containing the token) back to the server and shows the result.
+redirect_page = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>OSF</title></head>
+<body>
+<p id="message">Logging in...</p>
+<script>
+var request = new XMLHttpRequest();
+request.open("POST", window.location.pathname);
+request.onload = function() {
+	document.getElementById("message").textContent = request.responseText;
+};
+request.onerror = function() {
+	document.getElementById("message").textContent =
+		"Could not complete the login. Please try again.";
+};
+request.send(window.location.hash.substring(1));
+// Don't keep the token in the address bar and history
+history.replaceState(null, "", window.location.pathname);
+</script>
+</body>
+</html>
+"""
+
+class BrowserLogin(QtCore.QObject):
+	""" Lets the user log in to the OSF in the system browser. It has the same
+	interface as loginwindow.LoginWindow, so the ConnectionManager can use
+	either of them. """
+
+	# Event fired when user successfully logged in
+	logged_in = QtCore.pyqtSignal()
+
+	# The hosts that are accepted in the redirect uri
+	loopback_hosts = ['localhost', '127.0.0.1', '::1']
+	# The maximum size of a request to the server. Anything larger is not sent
+	# by the redirect page.
+	max_request_size = 64*1024
+
+	def __init__(self, *args, **kwargs):
+		""" Constructor """
+		super(BrowserLogin, self).__init__(*args, **kwargs)
+		self.url = None
+		self.server = QtNetwork.QTcpServer(self)
+		self.server.newConnection.connect(self.__accept)
+		# The data received so far on the open connections
+		self.buffers = {}
+
+	def load(self, url):
+		""" Starts the server that the browser is redirected to, in preparation
+		of showing the login page at url. Raises a ValueError if the redirect
+		uri is not a loopback url, or if its port can't be listened on.
+
+		Parameters
+		----------
+		url : QtCore.QUrl
+			The authorization url (see connection.get_authorization_url())
+		"""
+		redirect_url = QtCore.QUrl(osf.settings['redirect_uri'])
+		if not redirect_url.host() in self.loopback_hosts:
+			raise ValueError(_(u"Logging in through the system browser requires "
+				"a redirect uri on localhost, not {}").format(
+				osf.settings['redirect_uri']))
+		if not self.server.isListening():
+			address = QtNetwork.QHostAddress(QtNetwork.QHostAddress.LocalHost
+				if redirect_url.host() != '::1' else
+				QtNetwork.QHostAddress.LocalHostIPv6)
+			if not self.server.listen(address, redirect_url.port(80)):
+				raise ValueError(_(u"Could not listen on port {}: {}").format(
+					redirect_url.port(80), self.server.errorString()))
+		self.path = redirect_url.path() or '/'
+		self.url = url
+
+	def show(self):
+		""" Opens the login page in the system browser """
+		if self.url is None:
+			raise RuntimeError("No login page has been loaded")
+		webbrowser.open(self.url.toString())
+
+	def hide(self):
+		""" Stops waiting for the browser to be redirected """
+		self.server.close()
+		self.url = None
+
+	def close(self):
+		""" Stops the server and closes all connections """
+		self.hide()
+		for socket in list(self.buffers):
+			socket.abort()
+		self.buffers.clear()
+		return True
+
+	def __accept(self):
+		""" Callback for new connections to the server """
+		while self.server.hasPendingConnections():
+			socket = self.server.nextPendingConnection()
+			self.buffers[socket] = b''
+			socket.readyRead.connect(self.__read)
+			socket.disconnected.connect(self.__disconnected)
+
+	def __disconnected(self):
+		socket = self.sender()
+		self.buffers.pop(socket, None)
+		socket.deleteLater()
+
+	def __read(self):
+		""" Callback for data received on a connection. Handles the request once
+		it has been received completely. """
+		socket = self.sender()
+		if not socket in self.buffers:
+			return
+		data = self.buffers[socket] + bytes(socket.readAll())
+		self.buffers[socket] = data
+		header_end = data.find(b'\r\n\r\n')
+		if header_end == -1 or len(data) > self.max_request_size:
+			if len(data) > self.max_request_size:
+				self.__respond(socket, 413, 'Request too large')
+			return
+		lines = safe_decode(data[:header_end], enc='latin-1').split('\r\n')
+		try:
+			method, target = lines[0].split(' ')[:2]
+		except ValueError:
+			self.__respond(socket, 400, 'Bad request')
+			return
+		length = 0
+		for line in lines[1:]:
+			name, _sep, value = line.partition(':')
+			if name.strip().lower() == 'content-length':
+				try:
+					length = int(value)
+				except ValueError:
+					self.__respond(socket, 400, 'Bad request')
+					return
+		body = data[header_end+4:]
+		if len(body) < length:
+			return
+		del self.buffers[socket]
+		self.__handle(socket, method, target.split('?')[0],
+			safe_decode(body[:length], errors='replace'))
+
+	def __handle(self, socket, method, path, body):
+		""" Responds to a complete request """
+		if path != self.path:
+			self.__respond(socket, 404, 'Not found')
+		elif method == 'GET':
+			self.__respond(socket, 200, redirect_page, 'text/html')
+		elif method == 'POST':
+			# Reconstruct the url the browser was redirected to. oauthlib only
+			# accepts https urls, but plain http is safe here as the token
+			# never leaves this machine, so the scheme is replaced.
+			redirect_url = QtCore.QUrl(osf.settings['redirect_uri'])
+			redirect_url.setScheme('https')
+			url = redirect_url.toString() + '#' + body
+			try:
+				token = osf.parse_token_from_url(url)
+			except (ValueError, OAuth2Error) as e:
+				logging.warning(e)
+				token = None
+			if token is None:
+				self.__respond(socket, 400, _(u"Logging in failed. Please "
+					"try again."))
+				return
+			self.__respond(socket, 200, _(u"You are logged in to the OSF. You "
+				"can close this page."))
+			self.hide()
+			self.logged_in.emit()
+		else:
+			self.__respond(socket, 405, 'Method not allowed')
+
+	def __respond(self, socket, status, text, content_type='text/plain'):
+		""" Sends a response and closes the connection once it is written """
+		self.buffers.pop(socket, None)
+		body = safe_encode(text)
+		header = ("HTTP/1.1 {} {}\r\n"
+			"Content-Type: {}; charset=utf-8\r\n"
+			"Content-Length: {}\r\n"
+			"Cache-Control: no-store\r\n"
+			"Connection: close\r\n\r\n").format(status,
+			'OK' if status == 200 else 'Error', content_type, len(body))
+		socket.write(safe_encode(header) + body)
+		socket.disconnectFromHost()
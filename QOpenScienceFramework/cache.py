@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Daniel Schreij
+
+This module is distributed under the Apache v2.0 License.
+You should have received a copy of the Apache v2.0 License
+along with this module. If not, see <http://www.apache.org/licenses/>.
+"""
+# Python3 compatibility
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import logging
+import hashlib
+from collections import OrderedDict
+
+# Python 2 and 3 compatiblity settings
+from QOpenScienceFramework.compat import *
+
+class LRUCache(object):
+	""" A dictionary-like cache holding at most maxsize entries. When it is
+	full, the entry that has not been used for the longest time is discarded
+	to make room for a new one. """
+
+	def __init__(self, maxsize=1024):
+		""" Constructor
+
+		Parameters
+		----------
+		maxsize : int (default: 1024)
+			The maximum number of entries to keep
+		"""
+		self.maxsize = maxsize
+		self.entries = OrderedDict()
+
+	def get(self, key, default=None):
+		""" Returns the value stored for key and marks it as recently used, or
+		returns default if key is not in the cache """
+		try:
+			value = self.entries.pop(key)
+		except KeyError:
+			return default
+		self.entries[key] = value
+		return value
+
+	def put(self, key, value):
+		""" Stores value for key, discarding the least recently used entries if
+		the cache is full """
+		self.entries.pop(key, None)
+		self.entries[key] = value
+		while len(self.entries) > self.maxsize:
+			self.entries.popitem(last=False)
+
+	def pop(self, key, default=None):
+		""" Removes key from the cache and returns its value, or default if
+		key is not in the cache """
+		return self.entries.pop(key, default)
+
+	def clear(self):
+		""" Removes all entries from the cache """
+		self.entries.clear()
+
+	def __contains__(self, key):
+		return key in self.entries
+
+	def __len__(self):
+		return len(self.entries)
+
+class DiskCache(object):
+	""" A cache that stores binary data in files in a directory, for instance
+	thumbnails of images on the OSF. The files together take up at most
+	max_bytes; if storing new data exceeds this budget, the least recently
+	used files are removed. The recency of the files is tracked through their
+	modification times, so it carries over to later sessions. """
+
+	def __init__(self, directory, max_bytes=50*1024**2):
+		""" Constructor
+
+		Parameters
+		----------
+		directory : str
+			The folder to store the files in. It is created when the first
+			entry is stored.
+		max_bytes : int (default: 50 MB)
+			The maximum total size of the stored files
+		"""
+		self.directory = directory
+		self.max_bytes = max_bytes
+		# The sizes of the stored files by their name, least recently used
+		# first
+		self.entries = OrderedDict()
+		self.total_bytes = 0
+		self.__scan()
+
+	def __scan(self):
+		""" Registers the files already present in the cache directory """
+		if not os.path.isdir(self.directory):
+			return
+		files = []
+		for filename in os.listdir(self.directory):
+			try:
+				stat = os.stat(os.path.join(self.directory, filename))
+			except OSError:
+				continue
+			files.append((stat.st_mtime, filename, stat.st_size))
+		for mtime, filename, size in sorted(files):
+			self.entries[filename] = size
+			self.total_bytes += size
+		self.__evict()
+
+	def __filename(self, key):
+		""" Returns the name of the file in which the data for key is stored """
+		return hashlib.sha1(safe_encode(key)).hexdigest()
+
+	def __remove(self, filename):
+		""" Removes the file from the cache """
+		self.total_bytes -= self.entries.pop(filename, 0)
+		try:
+			os.remove(os.path.join(self.directory, filename))
+		except OSError:
+			pass
+
+	def __evict(self):
+		""" Removes the least recently used files until the budget is met """
+		while self.total_bytes > self.max_bytes and self.entries:
+			self.__remove(next(iter(self.entries)))
+
+	def get(self, key):
+		""" Returns the data stored for key, or None if there is none
+
+		Parameters
+		----------
+		key : str
+			The key the data was stored under
+
+		Returns
+		-------
+		bytes : the stored data, or None
+		"""
+		filename = self.__filename(key)
+		if not filename in self.entries:
+			return None
+		path = os.path.join(self.directory, filename)
+		try:
+			with open(path, 'rb') as fp:
+				data = fp.read()
+			# Mark the file as recently used
+			os.utime(path, None)
+		except (IOError, OSError) as e:
+			logging.warning("Could not read {} from cache: {}".format(path, e))
+			self.__remove(filename)
+			return None
+		self.entries[filename] = self.entries.pop(filename)
+		return data
+
+	def put(self, key, data):
+		""" Stores data under key, replacing any data stored for it before
+
+		Parameters
+		----------
+		key : str
+			The key to store the data under
+		data : bytes
+			The data to store
+		"""
+		filename = self.__filename(key)
+		self.__remove(filename)
+		if len(data) > self.max_bytes:
+			return
+		path = os.path.join(self.directory, filename)
+		try:
+			if not os.path.isdir(self.directory):
+				# Only the current user may read the cached data
+				os.makedirs(self.directory, 0o700)
+			with open(path, 'wb') as fp:
+				fp.write(data)
+		except (IOError, OSError) as e:
+			logging.warning("Could not write {} to cache: {}".format(path, e))
+			return
+		self.entries[filename] = len(data)
+		self.total_bytes += len(data)
+		self.__evict()
+
+	def __contains__(self, key):
+		return self.__filename(key) in self.entries
+
+	def clear(self):
+		""" Removes all files from the cache """
+		for filename in list(self.entries):
+			self.__remove(filename)
+
+	def __len__(self):
+		return len(self.entries)
@@ -0,0 +1,469 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Daniel Schreij
+
+This module is distributed under the Apache v2.0 License.
+You should have received a copy of the Apache v2.0 License
+along with this module. If not, see <http://www.apache.org/licenses/>.
+
+The qosf command, for moving data to and from the OSF without the widgets,
+e.g. from cron jobs or cluster nodes. It uses the token stored by the widgets
+(see events.TokenFileListener). Remote locations are specified as
+<project id>/<provider>/<path>, e.g. abc12/osfstorage/data/sub01.
+
+	qosf ls -R abc12/osfstorage
+	qosf download --jobs 16 abc12/osfstorage/data ./data
+	qosf upload ./results abc12/osfstorage/results
+	qosf sync abc12/osfstorage/data ./data
+
+Progress is reported on stderr, on a single updating line if it is a terminal
+and on a separate line every progress_interval seconds otherwise (e.g. in the
+log of a cron job). When a command is finished, a summary in JSON format (with
+the number of files and bytes transferred, the time it took and the
+throughput) is written to stdout.
+"""
+# Python3 compatibility
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+# OSF modules
+from QOpenScienceFramework import connection as osf
+# Python 2 and 3 compatiblity settings
+from QOpenScienceFramework.compat import *
+
+# The size of the chunks in which files are downloaded
+chunk_size = 256*1024
+# The number of seconds between progress reports if stderr is not a terminal
+progress_interval = 10
+
+class NotFoundError(ValueError):
+	""" Raised if a remote file or folder does not exist """
+	pass
+
+class Progress(object):
+	""" Keeps track of the transferred files and bytes, from several threads,
+	and reports them on stderr. On a terminal, a single line is updated at most
+	ten times per second. Otherwise, a line is added every progress_interval
+	seconds. """
+
+	def __init__(self, total_files, total_bytes, enabled=True):
+		self.total_files = total_files
+		self.total_bytes = total_bytes
+		self.files = 0
+		self.bytes = 0
+		self.errors = []
+		self.enabled = enabled
+		self.interactive = sys.stderr.isatty()
+		self.interval = .1 if self.interactive else progress_interval
+		self.start = time.time()
+		self.last_report = 0
+		self.lock = threading.Lock()
+
+	def add_bytes(self, count):
+		with self.lock:
+			self.bytes += count
+			self.__report()
+
+	def file_done(self, error=None):
+		with self.lock:
+			if error is None:
+				self.files += 1
+			else:
+				self.errors.append(error)
+			self.__report(force=True)
+
+	def __report(self, force=False):
+		if not self.enabled:
+			return
+		now = time.time()
+		# Finished files are shown right away on a terminal only, so that logs
+		# don't get a line per file
+		if (not force or not self.interactive) and \
+			now - self.last_report < self.interval:
+			return
+		self.last_report = now
+		self.__write(now)
+
+	def __write(self, now):
+		line = "{}/{} files, {:.1f}/{:.1f} MB, {:.1f} MB/s".format(
+			self.files, self.total_files, self.bytes/1e6, self.total_bytes/1e6,
+			self.bytes/1e6/max(now - self.start, 1e-6))
+		if self.interactive:
+			sys.stderr.write("\r" + line + "   ")
+		else:
+			sys.stderr.write(line + "\n")
+		sys.stderr.flush()
+
+	def summary(self, command):
+		""" Returns the summary of the transfers as a dict """
+		if self.enabled:
+			if self.interactive:
+				sys.stderr.write("\n")
+			else:
+				# The final state, which the last periodic line may not show
+				with self.lock:
+					self.__write(time.time())
+		seconds = time.time() - self.start
+		return {
+			"command": command,
+			"files": self.files,
+			"bytes": self.bytes,
+			"seconds": round(seconds, 3),
+			"bytes_per_second": round(self.bytes / max(seconds, 1e-6)),
+			"files_per_second": round(self.files / max(seconds, 1e-6), 2),
+			"errors": self.errors,
+		}
+
+def parse_remote(location):
+	""" Splits a remote location into the project id, provider and the path
+	within the provider """
+	parts = [part for part in location.strip("/").split("/") if part]
+	if not parts:
+		raise ValueError("Invalid remote location: {}".format(location))
+	provider = parts[1] if len(parts) > 1 else None
+	return parts[0], provider, "/".join(parts[2:])
+
+def walk(project_id, provider, path=""):
+	""" Walks the folders below path in the provider (see connection.walk()),
+	yielding paths relative to path. Only the folders leading to path are
+	retrieved on the way there. """
+	if provider is None and path:
+		raise ValueError("A path requires a provider")
+	target = "/".join(part for part in (provider, path) if part)
+	found = False
+	for folder, folders, files in osf.walk(project_id, provider):
+		if len(folder) < len(target):
+			# Not there yet: only descend towards the target
+			folders[:] = [entry for entry in folders if (target + "/").startswith(
+				"/".join(part for part in (folder, entry["attributes"]["name"])
+				if part) + "/")]
+			continue
+		found = True
+		yield folder[len(target):].strip("/"), folders, files
+	if not found and path:
+		raise NotFoundError("No such folder: {}".format(target))
+
+def find_entry(project_id, provider, path):
+	""" Returns the JSON representation of the file or folder at path in the
+	provider. For folders, this contains their upload and new folder links. """
+	parent, name = ("/" + path).rsplit("/", 1)
+	if not name:
+		# The provider itself is listed at the top level of the project
+		listing = osf.direct_api_call(osf.api_call("project_repos", project_id))
+		entries = listing["data"] if isinstance(listing, dict) else []
+		name = provider
+	else:
+		folders, files = next(walk(project_id, provider, parent.strip("/")))[1:]
+		entries = folders + files
+	for entry in entries:
+		if entry["attributes"]["name"] == name:
+			return entry
+	raise NotFoundError("No such file or folder: {}".format(
+		"/".join(part for part in (project_id, provider, path) if part)))
+
+def find_folder(project_id, provider, path, create=False):
+	""" Returns the JSON representation of the folder at path in the provider.
+	If create is True, the folder and its parents are created if they don't
+	exist yet. """
+	try:
+		entry = find_entry(project_id, provider, path)
+	except NotFoundError:
+		if not create or not path:
+			raise
+		parent, name = ("/" + path).rsplit("/", 1)
+		return create_folder(find_folder(project_id, provider,
+			parent.strip("/"), create), name)
+	if entry["attributes"].get("kind") == "file":
+		raise ValueError("Not a folder: {}".format(
+			"/".join((project_id, provider, path))))
+	return entry
+
+def check_response(response):
+	""" Raises OSFInvalidResponse if the response indicates an error """
+	if response.status_code >= 400:
+		raise osf.OSFInvalidResponse("Could not handle response {}: {}".format(
+			response.status_code, response.reason))
+
+def replace_file(source, destination):
+	""" Moves source to destination, replacing destination if it exists """
+	try:
+		os.replace(source, destination)
+	except AttributeError:
+		# Python 2 only has os.rename(), which doesn't replace files on Windows
+		if os.name == "nt" and os.path.exists(destination):
+			os.remove(destination)
+		os.rename(source, destination)
+
+def download(url, destination, progress):
+	""" Downloads a file in chunks. The file is written to a temporary file
+	next to destination, which is only moved into place once the download is
+	complete, so that a failed download doesn't leave a truncated file behind
+	(which sync would consider to be present). """
+	response = osf.session.get(url, stream=True)
+	check_response(response)
+	# Not created with tempfile, so that the file gets the usual permissions
+	temp_path = destination + ".part"
+	try:
+		with open(temp_path, "wb") as fp:
+			for chunk in response.iter_content(chunk_size):
+				fp.write(chunk)
+				progress.add_bytes(len(chunk))
+		replace_file(temp_path, destination)
+	except BaseException:
+		if os.path.exists(temp_path):
+			os.remove(temp_path)
+		raise
+
+class _ProgressReader(object):
+	""" A file object that reports the number of bytes read from it """
+
+	def __init__(self, fp, progress):
+		self.fp = fp
+		self.progress = progress
+		self.len = os.fstat(fp.fileno()).st_size
+
+	def read(self, size=-1):
+		data = self.fp.read(size)
+		self.progress.add_bytes(len(data))
+		return data
+
+def upload(url, source, name, progress):
+	""" Uploads a file to the folder with upload link url, or replaces the
+	file with upload link url if name is None """
+	params = {"kind": "file"}
+	if not name is None:
+		params["name"] = name
+	with open(source, "rb") as fp:
+		response = osf.session.put(url, params=params,
+			data=_ProgressReader(fp, progress))
+	check_response(response)
+
+def create_folder(folder, name):
+	""" Creates a folder in folder (the JSON representation of a folder) and
+	returns the JSON representation of the new folder """
+	response = osf.session.put(folder["links"]["new_folder"],
+		params={"name": name})
+	check_response(response)
+	return response.json()["data"]
+
+def run_transfers(transfers, jobs, progress):
+	""" Runs (function, args, description) transfers with jobs threads """
+	executor = ThreadPoolExecutor(max_workers=jobs)
+	futures = dict((executor.submit(function, *(args + (progress,))),
+		description) for function, args, description in transfers)
+	for future in as_completed(futures):
+		error = future.exception()
+		progress.file_done(None if error is None else
+			"{}: {}".format(futures[future], error))
+	executor.shutdown()
+
+def remote_files(location):
+	""" Returns the files below a remote location by their relative path. If
+	the location is a file, only that file is returned, by its name. """
+	project_id, provider, path = parse_remote(location)
+	if path:
+		entry = find_entry(project_id, provider, path)
+		if entry["attributes"].get("kind") == "file":
+			return {entry["attributes"]["name"]: entry}
+	files = {}
+	for folder, folders, entries in walk(project_id, provider, path):
+		for entry in entries:
+			name = entry["attributes"]["name"]
+			files[folder + "/" + name if folder else name] = entry
+	return files
+
+def remote_timestamp(entry):
+	""" Returns the modification time of a remote file as a timestamp, or None
+	if it is not known """
+	modified = entry["attributes"].get("date_modified")
+	if not modified:
+		return None
+	# Only imported when needed, as it is slow to import
+	import arrow
+	return arrow.get(modified).float_timestamp
+
+def needs_download(entry, destination):
+	""" Checks if the local file at destination differs from the remote file
+	(by size, or by being older) """
+	if not os.path.isfile(destination):
+		return True
+	if entry["attributes"].get("size") != os.path.getsize(destination):
+		return True
+	modified = remote_timestamp(entry)
+	return not modified is None and modified > os.path.getmtime(destination)
+
+def needs_upload(entry, source):
+	""" Checks if the remote file differs from the local file at source (by
+	size, or by being older) """
+	if entry is None or entry["attributes"].get("size") != \
+		os.path.getsize(source):
+		return True
+	modified = remote_timestamp(entry)
+	return not modified is None and modified < os.path.getmtime(source)
+
+def cmd_ls(args):
+	project_id, provider, path = parse_remote(args.location)
+	for folder, folders, files in walk(project_id, provider, path):
+		for entry in folders + files:
+			name = entry["attributes"]["name"]
+			suffix = "/" if entry["attributes"]["kind"] == "folder" else ""
+			print((folder + "/" if folder else "") + name + suffix)
+		if not args.recursive:
+			break
+	return None
+
+def cmd_download(args, only_changed=False):
+	files = remote_files(args.remote)
+	transfers = []
+	total = 0
+	for path, entry in sorted(files.items()):
+		destination = os.path.join(args.local, *path.split("/"))
+		if only_changed and not needs_download(entry, destination):
+			continue
+		folder = os.path.dirname(destination)
+		if not os.path.isdir(folder):
+			os.makedirs(folder)
+		transfers.append((download, (entry["links"]["download"], destination),
+			path))
+		total += entry["attributes"].get("size") or 0
+	progress = Progress(len(transfers), total, not args.no_progress)
+	run_transfers(transfers, args.jobs, progress)
+	return progress.summary("sync" if only_changed else "download")
+
+def get_folder(folders, path):
+	""" Returns the remote folder at path (relative to the target of an
+	upload), creating it and its parents if they don't exist yet. Created
+	folders are stored in folders. """
+	if path in folders:
+		return folders[path]
+	parent, name = ("/" + path).rsplit("/", 1)
+	parent_folder = get_folder(folders, parent.strip("/"))
+	folder = create_folder(parent_folder, name)
+	folders[path] = folder
+	return folder
+
+def cmd_upload(args, only_changed=False):
+	project_id, provider, path = parse_remote(args.remote)
+	folders = {"": find_folder(project_id, provider, path, create=True)}
+	try:
+		existing = remote_files(args.remote) if only_changed else {}
+	except NotFoundError:
+		# The folder has just been created
+		existing = {}
+	transfers = []
+	total = 0
+	if os.path.isfile(args.local):
+		sources = [(os.path.basename(args.local), args.local)]
+	else:
+		sources = []
+		for root, dirs, names in os.walk(args.local):
+			relative = os.path.relpath(root, args.local).replace(os.sep, "/")
+			relative = "" if relative == "." else relative
+			for name in sorted(names):
+				sources.append((relative + "/" + name if relative else name,
+					os.path.join(root, name)))
+	for relative, source in sources:
+		size = os.path.getsize(source)
+		entry = existing.get(relative)
+		if only_changed and not needs_upload(entry, source):
+			continue
+		folder, name = ("/" + relative).rsplit("/", 1)
+		folder = folder.strip("/")
+		if not entry is None:
+			# Replace the remote file
+			transfers.append((upload, (entry["links"]["upload"], source, None),
+				relative))
+		else:
+			url = get_folder(folders, folder)["links"]["upload"]
+			transfers.append((upload, (url, source, name), relative))
+		total += size
+	progress = Progress(len(transfers), total, not args.no_progress)
+	run_transfers(transfers, args.jobs, progress)
+	return progress.summary("sync" if only_changed else "upload")
+
+def cmd_sync(args):
+	if args.direction == "up":
+		return cmd_upload(args, only_changed=True)
+	return cmd_download(args, only_changed=True)
+
+def create_parser():
+	parser = argparse.ArgumentParser(prog="qosf",
+		description="Transfer data to and from the Open Science Framework")
+	parser.add_argument("--tokenfile", default="token.json",
+		help="The token file stored by the OSF widgets (default: token.json)")
+	subparsers = parser.add_subparsers(dest="command")
+	subparsers.required = True
+
+	ls = subparsers.add_parser("ls", help="List the contents of a folder")
+	ls.add_argument("-R", "--recursive", action="store_true",
+		help="List the contents of subfolders as well")
+	ls.add_argument("location", help="<project id>[/<provider>[/<path>]]")
+	ls.set_defaults(function=cmd_ls)
+
+	for name, function, help in [
+		("download", cmd_download, "Download a folder or file"),
+		("upload", cmd_upload, "Upload a folder or file"),
+		("sync", cmd_sync, "Transfer only new and changed files"),
+		]:
+		sub = subparsers.add_parser(name, help=help)
+		sub.add_argument("-j", "--jobs", type=int, default=8,
+			help="The number of files to transfer at once (default: 8)")
+		sub.add_argument("--no-progress", action="store_true",
+			help="Don't report progress on stderr")
+		if name == "upload":
+			sub.add_argument("local", help="The local file or folder")
+			sub.add_argument("remote", help="<project id>/<provider>[/<path>] "
+				"(created if it doesn't exist)")
+		else:
+			sub.add_argument("remote", help="<project id>/<provider>[/<path>]")
+			sub.add_argument("local", help="The local folder")
+		if name == "sync":
+			sub.add_argument("--direction", choices=["down", "up"],
+				default="down", help="down: from the OSF to the local folder "
+				"(default), up: the other way around")
+		sub.set_defaults(function=function)
+	return parser
+
+def login(tokenfile):
+	""" Creates the session with the token in tokenfile """
+	try:
+		with open(tokenfile) as fp:
+			token = json.load(fp)
+	except (IOError, ValueError) as e:
+		raise osf.TokenExpiredError("Could not read token from {}: {}".format(
+			tokenfile, e))
+	# The client id and redirect uri are only needed to obtain a token
+	osf.settings.setdefault("client_id", "")
+	osf.settings.setdefault("redirect_uri", "")
+	osf.create_session()
+	osf.session.token = token
+	if not osf.token_valid():
+		raise osf.TokenExpiredError("The supplied token has expired")
+
+def main(argv=None):
+	args = create_parser().parse_args(argv)
+	try:
+		login(args.tokenfile)
+		summary = args.function(args)
+	except (osf.OSFInvalidResponse, osf.TokenExpiredError, ValueError,
+		requests.RequestException, IOError, OSError) as e:
+		sys.stderr.write("qosf: {}\n".format(safe_decode(e)))
+		return 1
+	if summary is None:
+		return 0
+	print(json.dumps(summary, indent=2))
+	return 1 if summary["errors"] else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -4,7 +4,6 @@ Created on Fri Mar 11 13:11:14 2016
 
 """
 import sys
-from qtpy import QtCore
 
 if sys.version_info >= (3,0,0):
 	py3 = True
@@ -46,6 +45,9 @@ def safe_encode(s, enc='utf-8', errors='strict'):
 def get_QUrl(url):
 	""" Qt4 doesn url handling a bit different than Qt5, so check for that
 	here."""
+	# Imported here, so that the modules that don't use Qt (connection,
+	# asyncclient and cli) can be used without it
+	from qtpy import QtCore
 	if QtCore.QT_VERSION_STR < '5':
 		return QtCore.QUrl.fromEncoded(url)
 	else:
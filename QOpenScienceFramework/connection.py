@@ -18,12 +18,20 @@ import os
 import time
 import logging
 import json
+try:
+	from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+except ImportError:
+	from urlparse import urlsplit, urlunsplit, parse_qsl
+	from urllib import urlencode
 
 # Module for easy OAuth2 usage, based on the requests library,
 # which is the easiest way to perform HTTP requests.
 
 # OAuth2Session
 import requests_oauthlib
+from requests.adapters import HTTPAdapter
+# Thread pool for walk()
+from concurrent.futures import ThreadPoolExecutor
 # Mobile application client that does not need a client_secret
 from oauthlib.oauth2 import MobileApplicationClient
 # Easier function decorating
@@ -35,6 +43,7 @@ with open(os.path.join(dirname, 'settings.json')) as fp:
 	settings = json.load(fp)
 base_url = settings['base_url']
 api_base_url = settings['api_base_url']
+files_base_url = settings.get('files_base_url', 'https://files.osf.io/')
 scope = settings['scope']
 website_url = settings['website_url']
 
@@ -46,6 +55,12 @@ class OSFInvalidResponse(Exception):
 
 session = None
 
+# The number of threads with which walk() retrieves listings, and the number
+# of connections per host kept open by the session for them
+walk_workers = 8
+# The maximum number of folders of which walk() retrieves the listings ahead
+walk_prefetch = 32
+
 #%%------------------ Main configuration and helper functions ------------------
 
 def create_session():
@@ -71,6 +86,10 @@ def create_session():
 		scope=scope,
 		redirect_uri=redirect_uri,
 	)
+	# Keep enough connections open for the threads of walk()
+	adapter = HTTPAdapter(pool_maxsize=max(walk_workers, 10))
+	session.mount("https://", adapter)
+	session.mount("http://", adapter)
 	return session
 
 # Generate correct URLs
@@ -87,7 +106,19 @@ api_calls = {
 	"file_info":"files/{}/"
 }
 
-def api_call(command, *args):
+# The fields that are retrieved of the entries in listings of projects and
+# files (JSON:API sparse fieldsets), which are the ones kept by
+# records.ItemRecord. The full representation of an entry can be retrieved
+# from its info url when it is needed.
+listing_fields = {
+	"nodes": ["title", "category", "date_created", "date_modified", "files"],
+	"files": ["name", "kind", "provider", "size", "date_created",
+		"date_modified", "files"],
+}
+# The number of entries per page of a listing
+listing_page_size = 100
+
+def api_call(command, *args, **kwargs):
 	""" generates and api endpoint. If arguments are required to build the endpoint, the can be
 	specified as extra arguments.
 
@@ -97,12 +128,92 @@ def api_call(command, *args):
 		The key of the endpoint to look up in the api_calls dictionary
 	*args : various (optional)
 		Optional extra data which is needed to construct the correct api endpoint uri
+	listing : bool (default: False)
+		If True, the endpoint is a listing of projects or files that should
+		only return the fields in listing_fields (see listing_url())
 
 	Returns
 	-------
 	string : The complete uri for the api endpoint
 	"""
-	return api_base_url + api_calls[command].format(*args)
+	url = api_base_url + api_calls[command].format(*args)
+	if kwargs.get('listing', False):
+		url = listing_url(url)
+	return url
+
+def listing_url(url, embed=None):
+	""" Adds the query parameters to the url of a listing of projects or files
+	that limit its entries to the fields in listing_fields, and that set the
+	page size to listing_page_size. Parameters that are already present in
+	the url (e.g. in the links to the next page of a listing) are left as
+	they are.
+
+	Parameters
+	----------
+	url : string
+		The url of the listing
+	embed : string (default: None)
+		A relationship of the entries of which the first page should be
+		included in the listing (JSON:API embed), e.g. "files" to include the
+		storage providers of projects. See embedded_listing().
+
+	Returns
+	-------
+	string : The url with the added parameters
+	"""
+	if not url:
+		return url
+	scheme, netloc, path, query, fragment = urlsplit(url)
+	params = parse_qsl(query, keep_blank_values=True)
+	present = set(key for key, value in params)
+	extra = [("fields[{}]".format(kind), ",".join(fields)) for kind, fields
+		in sorted(listing_fields.items())]
+	extra.append(("page[size]", str(listing_page_size)))
+	if embed:
+		extra.append(("embed", embed))
+	params += [(key, value) for key, value in extra if not key in present]
+	return urlunsplit((scheme, netloc, path, urlencode(params), fragment))
+
+def page_url(url, page):
+	""" Returns url with its page parameter set to page """
+	scheme, netloc, path, query, fragment = urlsplit(url)
+	params = [(key, value) for key, value in
+		parse_qsl(query, keep_blank_values=True) if key != "page"]
+	params.append(("page", str(page)))
+	return urlunsplit((scheme, netloc, path, urlencode(params), fragment))
+
+def strip_embed(url):
+	""" Returns url without the embed parameter added by listing_url(), or
+	None if url has no such parameter. Used to repeat a request for which
+	embedding failed. """
+	scheme, netloc, path, query, fragment = urlsplit(url)
+	params = parse_qsl(query, keep_blank_values=True)
+	stripped = [(key, value) for key, value in params if key != "embed"]
+	if len(stripped) == len(params):
+		return None
+	return urlunsplit((scheme, netloc, path, urlencode(stripped), fragment))
+
+def embedded_listing(entry, relationship):
+	""" Returns the listing of a relationship that is embedded in an entry of
+	a listing (see the embed parameter of listing_url()).
+
+	Parameters
+	----------
+	entry : dict
+		The JSON representation of the entry
+	relationship : string
+		The name of the embedded relationship, e.g. "files"
+
+	Returns
+	-------
+	dict : the embedded listing, with data and links entries like that of a
+	regular listing, or None if it was not embedded or could not be embedded.
+	"""
+	listing = (entry.get("embeds") or {}).get(relationship)
+	if not isinstance(listing, dict) or "errors" in listing or \
+		not isinstance(listing.get("data"), list):
+		return None
+	return listing
 
 def check_for_active_session():
 	""" Checks if a session object has been created and returns an Error otherwise."""
@@ -256,5 +367,137 @@ def get_repo_files(project_id, repo_name):
 def direct_api_call(api_call):
 	return session.get(api_call)
 
+class _WalkFolder(object):
+	""" A folder that walk() has yet to visit, with the requests for the pages
+	of its listing """
+
+	__slots__ = ('path', 'url', 'pages', 'expanded')
+
+	def __init__(self, path, url):
+		self.path = path
+		self.url = url
+		# Futures of the requested pages, or None if nothing was requested yet
+		self.pages = None
+		# True if the requests for all pages have been made
+		self.expanded = False
+
+	def request(self, executor):
+		""" Requests the first page of the listing """
+		self.pages = [executor.submit(direct_api_call, self.url)]
+
+	def expand(self, executor):
+		""" Requests all further pages of the listing at once, if the first
+		page tells how many there are. Otherwise, the pages are retrieved one
+		by one from the next links by entries(). """
+		self.expanded = True
+		first = self.__result(self.pages[0])
+		meta = first.get("links", {}).get("meta") or {}
+		try:
+			count = -(-int(meta["total"]) // int(meta["per_page"]))
+		except (KeyError, TypeError, ValueError, ZeroDivisionError):
+			return
+		self.pages += [executor.submit(direct_api_call,
+			page_url(self.url, page)) for page in range(2, count+1)]
+
+	def entries(self, executor):
+		""" Returns all entries of the listing """
+		if not self.expanded:
+			self.expand(executor)
+		entries = []
+		for page in self.pages:
+			entries += self.__result(page)["data"]
+		if len(self.pages) == 1:
+			# The number of pages was not known, so follow the next links
+			url = self.__result(self.pages[0]).get("links", {}).get("next")
+			while url:
+				listing = self.__result(direct_api_call(url))
+				entries += listing["data"]
+				url = listing.get("links", {}).get("next")
+		return entries
+
+	@staticmethod
+	def __result(page):
+		""" Returns the listing of a page, waiting for it if necessary """
+		if hasattr(page, "result"):
+			page = page.result()
+		if not isinstance(page, dict) or not "data" in page:
+			raise OSFInvalidResponse("Could not retrieve listing")
+		return page
+
+def walk(project_id, provider=None):
+	""" Generates the folders and files of a project, like os.walk(). The
+	folders are visited top-down. While the caller processes a folder, the
+	listings of the folders that are visited next (and the further pages of
+	these listings) are retrieved in the background, by walk_workers threads.
+	At most walk_prefetch listings are retrieved ahead, so that large projects
+	can be traversed without holding the whole tree in memory.
+
+	As with os.walk(), the caller can remove entries from the list of folders
+	to prevent them from being visited.
+
+	Parameters
+	----------
+	project_id : string
+		The id of the project (node)
+	provider : string (default: None)
+		The storage provider (e.g. osfstorage) to walk. If None, all
+		providers are walked, starting at the top level of the project where
+		they are listed as folders.
+
+	Yields
+	------
+	tuple : (path, folders, files), with the path of the folder relative to
+	the project (e.g. osfstorage/data) and the JSON representations of the
+	folders and files in it.
+
+	Raises
+	------
+	OSFInvalidResponse : if a listing could not be retrieved
+	"""
+	if provider is None:
+		root = _WalkFolder("", api_call("project_repos", project_id,
+			listing=True))
+	else:
+		root = _WalkFolder(provider, api_call("repo_files", project_id,
+			provider, listing=True))
+	stack = [root]
+	executor = ThreadPoolExecutor(max_workers=walk_workers)
+	try:
+		while stack:
+			# Request the listings of the folders that are visited next
+			requested = 0
+			for folder in reversed(stack):
+				if requested >= walk_prefetch:
+					break
+				if folder.pages is None:
+					folder.request(executor)
+				elif not folder.expanded and folder.pages[0].done():
+					folder.expand(executor)
+				requested += 1
+
+			folder = stack.pop()
+			folders, files = [], []
+			for entry in folder.entries(executor):
+				if entry["attributes"]["kind"] == "folder":
+					folders.append(entry)
+				else:
+					files.append(entry)
+			yield folder.path, folders, files
+
+			for entry in reversed(folders):
+				try:
+					url = entry["relationships"]["files"]["links"]["related"]\
+						["href"]
+				except KeyError:
+					continue
+				name = entry["attributes"]["name"]
+				path = folder.path + "/" + name if folder.path else name
+				stack.append(_WalkFolder(path, listing_url(url)))
+	finally:
+		# Don't wait for listings that are no longer needed if the caller
+		# stopped early
+		executor.shutdown(wait=False)
+
+
 if __name__ == "__main__":
 	print(get_authorization_url())
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Daniel Schreij
+
+This module is distributed under the Apache v2.0 License.
+You should have received a copy of the Apache v2.0 License
+along with this module. If not, see <http://www.apache.org/licenses/>.
+
+Cached file type detection for files on the OSF. As these files are not
+present locally, their type can only be derived from their name (which is
+also what fileinspector falls back to for files it can't open). The results
+therefore only depend on the extension, and are cached per extension.
+
+fileinspector is only imported when the first type is looked up, at which
+point the types of common extensions are determined as well.
+"""
+# Python3 compatibility
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import mimetypes
+
+from QOpenScienceFramework.cache import LRUCache
+
+# Mimetypes by lowercase extension
+_type_cache = LRUCache(maxsize=512)
+# Categories by mimetype
+_category_cache = LRUCache(maxsize=128)
+# Whether the types of the common extensions have been determined
+_warmed_up = False
+
+# Extensions that are common in research data, for which the types are
+# determined when the first type is looked up.
+common_extensions = [
+	'.csv', '.tsv', '.txt', '.dat', '.log', '.json', '.xml', '.xls', '.xlsx',
+	'.ods', '.sav', '.mat', '.npy', '.npz', '.h5', '.hdf5', '.edf', '.bdf',
+	'.nii', '.nii.gz', '.py', '.r', '.m', '.ipynb', '.md', '.html', '.pdf',
+	'.doc', '.docx', '.odt', '.ppt', '.pptx', '.png', '.jpg', '.jpeg', '.gif',
+	'.bmp', '.tif', '.tiff', '.svg', '.wav', '.mp3', '.mp4', '.avi', '.zip',
+	'.tar.gz', '.osexp', '.opensesame',
+]
+
+def type_key(filename):
+	""" Returns the lowercase extension of filename under which its type is
+	cached. Compression suffixes (such as .gz) are combined with the
+	extension in front of them, as in .tar.gz. """
+	root, ext = os.path.splitext(filename.lower())
+	if ext in mimetypes.encodings_map or ext in mimetypes.suffix_map:
+		ext = os.path.splitext(root)[1] + ext
+	return ext
+
+def _lookup(key):
+	""" Returns the mimetype for the extension key, determining and caching it
+	if it was not looked up before """
+	if key in _type_cache:
+		return _type_cache.get(key)
+	if not _warmed_up:
+		warm_up()
+		if key in _type_cache:
+			return _type_cache.get(key)
+	import fileinspector
+	mimetype = fileinspector.determine_type_with_mimetypes('file' + key)
+	_type_cache.put(key, mimetype)
+	return mimetype
+
+def _format(mimetype, output):
+	if output == 'xdg' and not mimetype is None:
+		import fileinspector
+		return fileinspector.translate_to_xdg(mimetype)
+	return mimetype
+
+def determine_type(filename, output='mime'):
+	""" Determines the type of a file by its name. The counterpart of
+	fileinspector.determine_type(), but cached by extension.
+
+	Parameters
+	----------
+	filename : str
+		The name of the file (including extension)
+	output : str (default: 'mime')
+		'mime' for <type>/<subtype>, or 'xdg' for the freedesktop
+		<type>-<subtype> format.
+
+	Returns
+	-------
+	str : the type in the specified format, or None if it could not be
+	determined.
+	"""
+	return _format(_lookup(type_key(filename)), output)
+
+def determine_types(filenames, output='mime'):
+	""" Determines the types of several files at once, for instance for all
+	files in a page of results. Every extension is only looked up once.
+
+	Parameters
+	----------
+	filenames : list
+		The names of the files
+	output : str (default: 'mime')
+		See determine_type()
+
+	Returns
+	-------
+	list : the types of the files, in the same order as filenames
+	"""
+	types = {}
+	result = []
+	for filename in filenames:
+		key = type_key(filename)
+		if not key in types:
+			types[key] = _format(_lookup(key), output)
+		result.append(types[key])
+	return result
+
+def determine_category(mimetype):
+	""" Determines the category (image, pdf, text, ...) of a mimetype. The
+	counterpart of fileinspector.determine_category(), but cached.
+
+	Returns
+	-------
+	str : the category or None if no match was found.
+	"""
+	if mimetype in _category_cache:
+		return _category_cache.get(mimetype)
+	import fileinspector
+	category = fileinspector.determine_category(mimetype)
+	_category_cache.put(mimetype, category)
+	return category
+
+def clear_cache():
+	""" Discards all cached types, e.g. after mimetypes has been extended """
+	_type_cache.clear()
+	_category_cache.clear()
+
+def warm_up(extensions=common_extensions):
+	""" Determines and caches the types of the specified extensions """
+	global _warmed_up
+	_warmed_up = True
+	for mimetype in determine_types(['file' + ext for ext in extensions]):
+		if not mimetype is None:
+			determine_category(mimetype)
@@ -15,6 +15,7 @@ from __future__ import unicode_literals
 # Import basics
 import logging
 import os
+import sys
 import json
 import time
 
@@ -26,7 +27,9 @@ import warnings
 import uuid
 
 # OSF modules
-from QOpenScienceFramework import events, loginwindow
+from QOpenScienceFramework import events
+# Rate-limited progress reports of transfers
+from QOpenScienceFramework.progress import TransferProgress, format_duration
 # Python 2 and 3 compatiblity settings
 from QOpenScienceFramework.compat import *
 
@@ -35,9 +38,91 @@ from functools import wraps
 # PyQt modules
 from qtpy import QtCore, QtNetwork, QtWidgets
 
+# The login window needs QtWebEngine or QtWebKit, which can't be imported once
+# a QApplication has been created. It is therefore imported here, and only the
+# creation of the window is deferred until the login page has to be shown.
+try:
+	from QOpenScienceFramework import loginwindow
+except ImportError as e:
+	logging.warning("Could not load the login window ({}), logging in "
+		"through the system browser instead".format(e))
+	loginwindow = None
+
+# orjson parses considerably faster than json, and takes bytes directly
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
 # Dummy function later to be replaced for translation
 _ = lambda s: s
 
+def buffer_of(data):
+	""" Returns a view on the contents of a QByteArray without copying them,
+	if the Qt bindings support this, or a copy of them otherwise """
+	try:
+		return memoryview(data)
+	except TypeError:
+		return data.data()
+
+def parse_json(data):
+	""" Parses a JSON document from a bytes-like object, such as the body of a
+	reply. Uses orjson if it is installed, which parses the data in place.
+	Otherwise, the data is passed to json as bytes, without decoding it to a
+	string first if the Python version allows this.
+
+	Parameters
+	----------
+	data : bytes, memoryview or QtCore.QByteArray
+		The UTF-8 encoded JSON document
+
+	Returns
+	-------
+	dict : the parsed document
+
+	Raises
+	------
+	ValueError : if data is not valid JSON
+	"""
+	if isinstance(data, QtCore.QByteArray):
+		data = buffer_of(data)
+	if not orjson is None:
+		return orjson.loads(data)
+	data = bytes(data)
+	# json only accepts bytes as of Python 3.6
+	if py3 and sys.version_info < (3, 6):
+		data = safe_decode(data)
+	return json.loads(data)
+
+class JSONParser(QtCore.QRunnable):
+	""" Parses the JSON body of a reply in a worker thread, so that large
+	responses don't block the GUI. The result, or the exception raised while
+	parsing, is emitted through the finished signal together with the reply. """
+
+	def __init__(self, reply, data, finished):
+		""" Constructor
+
+		Parameters
+		----------
+		reply : QtNetwork.QNetworkReply
+			The reply the data belongs to
+		data : QtCore.QByteArray
+			The body of the reply
+		finished : QtCore.pyqtBoundSignal
+			The signal to emit with the reply and the parsed data
+		"""
+		super(JSONParser, self).__init__()
+		self.reply = reply
+		self.data = data
+		self.finished = finished
+
+	def run(self):
+		try:
+			result = parse_json(self.data)
+		except ValueError as e:
+			result = e
+		self.finished.emit(self.reply, result)
+
 class ConnectionManager(QtNetwork.QNetworkAccessManager):
 	"""
 	The connection manager does most of the heavy lifting in communicating with the
@@ -46,10 +131,29 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 
 	# The maximum number of allowed redirects
 	MAX_REDIRECTS = 5
+	# The servers to which connections are opened as soon as the user starts
+	# logging in (see prewarm_connections())
+	prewarm_urls = [osf.api_base_url, osf.files_base_url]
+	# The number of milliseconds between updates of progress dialogs and
+	# transferProgress callbacks (see TransferProgress)
+	progress_interval = 100
+	# The maximum number of bytes of a download that Qt buffers in memory.
+	# When this buffer is full, Qt stops reading from the connection until the
+	# data has been written to disk, so memory use stays the same however
+	# large the file is and however slow the disk is.
+	download_buffer_size = 4*1024**2
+	# The size of the chunks in which downloads are written to disk
+	download_chunk_size = 256*1024
+	# The maximum number of chunks that are written per pass of the event loop
+	download_chunks_per_pass = 16
+	# The largest value a progress dialog (which takes a C int) can show
+	max_progress_value = 2**31 - 1
 	error_message = QtCore.pyqtSignal('QString','QString')
 	warning_message = QtCore.pyqtSignal('QString','QString')
 	info_message = QtCore.pyqtSignal('QString','QString')
 	success_message = QtCore.pyqtSignal('QString','QString')
+	# Emitted by JSONParser when the body of a reply has been parsed
+	json_parsed = QtCore.pyqtSignal(object, object)
 
 	# Dictionary holding requests in progress, so that they can be repeated if
 	# mid-request it is discovered that the OAuth2 token is no longer valid.
@@ -69,14 +173,22 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 			should expect two strings. This object is repsonsible for displaying
 			the messages, or passing them on to a different object responsible for
 			the display.
+		system_browser : bool (default: False)
+			Whether the user logs in through the system browser (see
+			browserlogin.BrowserLogin) instead of a window with an embedded
+			browser. This requires the redirect uri to be a loopback url. The
+			system browser is also used if QtWebEngine and QtWebKit are not
+			available.
 		"""
 		# See if tokenfile and notifier are specified as keyword args
 		tokenfile = kwargs.pop("tokenfile", "token.json")
 		notifier  = kwargs.pop("notifier", None)
+		system_browser = kwargs.pop("system_browser", False)
 
 		# Call parent's constructor
 		super(ConnectionManager, self).__init__(*args, **kwargs)
 		self.tokenfile = tokenfile
+		self.system_browser = system_browser
 		self.dispatcher = events.EventDispatcher()
 
 		# Notifications
@@ -105,25 +217,36 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 		self.success_message.connect(self.notifier.success)
 		self.warning_message.connect(self.notifier.warning)
 
-		# Init browser in which login page is displayed
-		self.browser = loginwindow.LoginWindow()
-		self.browser.setWindowTitle(_(u"Log in to OSF"))
-		# Make sure browser closes if parent QWidget closes
-		if isinstance(self.parent(), QtWidgets.QWidget):
-			self.parent().destroyed.connect(self.browser.close)
-
-		# Connect browsers logged in event to that of dispatcher's
-		self.browser.logged_in.connect(self.dispatcher.dispatch_login)
+		# The browser in which the login page is displayed. It is only created
+		# once the login page has to be shown (see show_login_window()), as
+		# setting up a web view is slow and is not necessary if a valid token
+		# is stored.
+		self.browser = None
 		self.logged_in_user = {}
 
 		self.config_mgr = QtNetwork.QNetworkConfigurationManager(self)
 
+		# The callbacks of replies of which the body is being parsed in a worker
+		# thread, the replies of which the callbacks are being called, and the
+		# parsed bodies of these replies (see read_json()).
+		self.pending_callbacks = {}
+		self.active_replies = set()
+		self.parsed_replies = {}
+		self.json_parsed.connect(self.__json_parsed)
+		# The TransferProgress objects of replies (see __track_progress()).
+		# They are kept here, as Python would otherwise garbage collect them.
+		self.progress_trackers = {}
+		# The downloads of which the received data is being written to disk
+		# over several passes of the event loop (see __write_download())
+		self.draining_replies = set()
+
 	#--- Login and Logout functions
 
 	def login(self):
 		""" Opens a browser window through which the user can log in. Upon successful
 		login, the browser widgets fires the 'logged_in' event. which is caught by this object
 		again in the handle_login() function. """
+		self.prewarm_connections()
 
 		# If a valid stored token is found, read that in an dispatch login event
 		if self.check_for_stored_token(self.tokenfile):
@@ -132,14 +255,37 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 		# Otherwise, do the whole authentication dance
 		self.show_login_window()
 
+	def __create_browser(self):
+		""" Creates the window in which the login page is displayed, or the
+		BrowserLogin if the system browser is used """
+		if not self.system_browser and not loginwindow is None:
+			self.browser = loginwindow.LoginWindow()
+			self.browser.setWindowTitle(_(u"Log in to OSF"))
+		if self.browser is None:
+			from QOpenScienceFramework.browserlogin import BrowserLogin
+			self.browser = BrowserLogin(self)
+		# Make sure browser closes if parent QWidget closes
+		if isinstance(self.parent(), QtWidgets.QWidget):
+			self.parent().destroyed.connect(self.browser.close)
+
+		# Connect browsers logged in event to that of dispatcher's
+		self.browser.logged_in.connect(self.dispatcher.dispatch_login)
+
 	def show_login_window(self):
 		""" Shows the QWebView window with the login page of OSF """
 		auth_url, state = osf.get_authorization_url()
 
 		# Set up browser
+		if self.browser is None:
+			self.__create_browser()
 		browser_url = get_QUrl(auth_url)
 
-		self.browser.load(browser_url)
+		try:
+			self.browser.load(browser_url)
+		except ValueError as e:
+			# The system browser can't be redirected back (see BrowserLogin)
+			self.error_message.emit(_(u"Could not log in"), safe_decode(e))
+			return
 		self.browser.show()
 
 	def logout(self):
@@ -206,11 +352,12 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 		@wraps(func)
 		def func_wrapper(inst, *args, **kwargs):
 			if not inst.config_mgr.isOnline():
-				inst.error_message.emit(
-					"No network access",
-					_(u"Your network connection is down or you currently have"
-					" no Internet access.")
-				)
+				if not kwargs.get('quiet', False):
+					inst.error_message.emit(
+						"No network access",
+						_(u"Your network connection is down or you currently have"
+						" no Internet access.")
+					)
 				return
 			else:
 				if inst.logged_in_user:
@@ -227,6 +374,72 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 				return func(inst, *args, **kwargs)
 		return func_wrapper
 
+	def prewarm_connections(self):
+		""" Opens the (encrypted) connections to the servers in prewarm_urls
+		ahead of time, so that the first requests to them don't have to wait
+		for the TLS handshake. Where HTTP/2 is available, it is offered to the
+		servers while doing so, so that the requests can use these connections
+		as well. As this only speeds up later requests, any error is logged and
+		otherwise ignored. """
+		try:
+			self.__prewarm_connections()
+		except Exception as e:
+			logging.warning("Could not open connections ahead of time: "
+				"{}".format(e))
+
+	def __prewarm_connections(self):
+		""" Does the work for prewarm_connections() """
+		for url in self.prewarm_urls:
+			url = QtCore.QUrl(url)
+			if url.scheme() != 'https':
+				self.connectToHost(url.host(), url.port(80))
+				continue
+			if not QtNetwork.QSslSocket.supportsSsl():
+				continue
+			config = QtNetwork.QSslConfiguration.defaultConfiguration()
+			if not self.__http2_attribute() is None:
+				# Not all PyQt versions expose these constants
+				config.setAllowedNextProtocols([
+					getattr(QtNetwork.QSslConfiguration, 'ALPNProtocolHTTP2',
+						b'h2'),
+					getattr(QtNetwork.QSslConfiguration, 'NextProtocolHttp1_1',
+						b'http/1.1')])
+			try:
+				self.connectToHostEncrypted(url.host(), url.port(443), config)
+			except TypeError:
+				# Qt < 5.13 can't be passed an SSL configuration
+				self.connectToHostEncrypted(url.host(), url.port(443))
+
+	@staticmethod
+	def __http2_attribute():
+		""" Returns the request attribute that allows HTTP/2, or None if the
+		Qt version does not support HTTP/2 (before 5.10) """
+		return getattr(QtNetwork.QNetworkRequest, 'Http2AllowedAttribute',
+			getattr(QtNetwork.QNetworkRequest, 'HTTP2AllowedAttribute', None))
+
+	def __prepare_request(self, request, follow_redirects=False):
+		""" Allows HTTP/2 for the request, if the Qt version supports it.
+		Optionally lets Qt follow redirects of the request itself (up to
+		MAX_REDIRECTS), which saves issuing a new request from
+		__reply_finished(). This requires Qt 5.9 or higher; for older versions
+		redirects are still handled by __reply_finished().
+
+		Parameters
+		----------
+		request : QtNetwork.QNetworkRequest
+			The request to prepare
+		follow_redirects : bool (default: False)
+			Whether Qt should follow redirects. Redirects to less secure
+			locations (https to http) are not followed.
+		"""
+		http2 = self.__http2_attribute()
+		if not http2 is None:
+			request.setAttribute(http2, True)
+		if follow_redirects and hasattr(request, 'RedirectPolicyAttribute'):
+			request.setAttribute(request.RedirectPolicyAttribute,
+				request.NoLessSafeRedirectPolicy)
+			request.setMaximumRedirectsAllowed(self.MAX_REDIRECTS)
+
 	def add_token(self, request):
 		""" Adds the OAuth2 token to the pending HTTP request (if available).
 
@@ -301,12 +514,43 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 			the reply object as an argument. This function is also called if the
 			operation is aborted by the user him/herself.
 		progressDialog : QtWidgets.QProgressDialog (default: None)
-			The dialog to send the progress indication to. Will be included in the
-			reply object so that it is accessible in the downloadProgress slot, by
-			calling self.sender().property('progressDialog')
+			The dialog to send the progress indication to. It is updated with
+			the progress, throughput and time remaining every
+			progress_interval ms. It is also included in the reply object, so
+			that it is accessible in the downloadProgress slot, by calling
+			self.sender().property('progressDialog')
+		transferProgress : callable (default: None)
+			Called every progress_interval ms during the transfer with the
+			number of bytes received, the total number of bytes (-1 if
+			unknown), the throughput in bytes per second and the estimated
+			number of seconds remaining (None if unknown). Unlike
+			downloadProgress, this is suitable for updating the GUI on fast
+			connections.
 		abortSignal : QtCore.pyqtSignal
 			This signal will be attached to the reply objects abort() slot, so that
 			the operation can be aborted from outside if necessary.
+		headers : dict (default: None)
+			Extra HTTP headers to send with the request, such as a Range header
+			to retrieve only part of a file. These are also sent along with
+			redirected requests.
+		priority : QtNetwork.QNetworkRequest.Priority (default: None)
+			The priority of the request, e.g. LowPriority for data that is
+			retrieved speculatively and is not waited for yet.
+		parseJSON : bool (default: False)
+			If True, the JSON body of the reply is parsed in a worker thread
+			before the callback is called, which keeps the GUI responsive for
+			large responses. The callback still receives the reply, and should
+			obtain the parsed body through read_json().
+		quiet : bool (default: False)
+			If True, errors are not reported through error_message (but
+			errorCallback is still called). Use this for requests the user
+			didn't ask for, such as prefetches, or requests that are retried
+			in a different form when they fail.
+		readBufferSize : int (default: None)
+			The maximum number of bytes of the response to buffer in memory
+			(see QNetworkReply.setReadBufferSize()). Only use this together
+			with readyRead, and read the data as it comes in, as the
+			transfer stalls when the buffer is full.
 		*args (optional)
 			Any other arguments that you want to have passed to the callback
 		**kwargs (optional)
@@ -317,6 +561,13 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 
 		# Create network request
 		request = QtNetwork.QNetworkRequest(url)
+		self.__prepare_request(request, follow_redirects=True)
+		if not kwargs.get('priority') is None:
+			request.setPriority(kwargs['priority'])
+
+		# Add any extra headers
+		for header, value in (kwargs.get('headers') or {}).items():
+			request.setRawHeader(safe_encode(header), safe_encode(value))
 
 		# Add OAuth2 token
 		if not self.add_token(request):
@@ -329,6 +580,10 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 
 		reply = super(ConnectionManager, self).get(request)
 
+		readBufferSize = kwargs.get('readBufferSize', None)
+		if readBufferSize:
+			reply.setReadBufferSize(readBufferSize)
+
 		# If provided, connect the abort signal to the reply's abort() slot
 		abortSignal = kwargs.get('abortSignal', None)
 		if not abortSignal is None:
@@ -357,6 +612,9 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 				lambda: rrCallback(*args, **kwargs)
 			)
 
+		self.__track_progress(reply, reply.downloadProgress, progressDialog,
+			kwargs.get('transferProgress', None))
+
 		reply.finished.connect(
 			lambda: self.__reply_finished(
 				callback, *args, **kwargs
@@ -392,6 +650,7 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 			raise TypeError("The POST data should be passed as a dict")
 
 		request = QtNetwork.QNetworkRequest(url)
+		self.__prepare_request(request)
 		request.setHeader(request.ContentTypeHeader,"application/x-www-form-urlencoded");
 
 		# Add OAuth2 token
@@ -441,9 +700,16 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 			the reply object as an argument. This function is also called if the
 			operation is aborted by the user him/herself.
 		progressDialog : QtWidgets.QProgressDialog (default: None)
-			The dialog to send the progress indication to. Will be included in the
-			reply object so that it is accessible in the downloadProgress slot, by
-			calling self.sender().property('progressDialog')
+			The dialog to send the progress indication to. It is updated with
+			the progress, throughput and time remaining every
+			progress_interval ms. It is also included in the reply object, so
+			that it is accessible in the uploadProgress slot, by calling
+			self.sender().property('progressDialog')
+		transferProgress : callable (default: None)
+			Called every progress_interval ms during the transfer with the
+			number of bytes sent, the total number of bytes, the throughput in
+			bytes per second and the estimated number of seconds remaining
+			(None if unknown).
 		abortSignal : QtCore.pyqtSignal
 			This signal will be attached to the reply objects abort() slot, so that
 			the operation can be aborted from outside if necessary.
@@ -461,6 +727,7 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 			raise TypeError("The data_to_send should be of type QtCore.QIODevice")
 
 		request = QtNetwork.QNetworkRequest(url)
+		self.__prepare_request(request)
 		# request.setHeader(request.ContentTypeHeader,"application/x-www-form-urlencoded");
 
 		# Add OAuth2 token
@@ -469,7 +736,6 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 				_(u"Token could not be added to the request"))
 
 		reply = super(ConnectionManager, self).put(request, data_to_send)
-		reply.finished.connect(lambda: self.__reply_finished(callback, *args, **kwargs))
 
 		# Check if a QProgressDialog has been passed to which the download status
 		# can be reported. If so, add it as a property of the reply object
@@ -491,6 +757,11 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 		if callable(ulpCallback):
 			reply.uploadProgress.connect(ulpCallback)
 
+		self.__track_progress(reply, reply.uploadProgress, progressDialog,
+			kwargs.get('transferProgress', None))
+
+		reply.finished.connect(lambda: self.__reply_finished(callback, *args, **kwargs))
+
 	@check_network_accessibility
 	def delete(self, url, callback, *args, **kwargs):
 		""" Perform a HTTP DELETE request. The OAuth2 token is automatically added to the
@@ -517,6 +788,7 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 		# First check the correctness of the url and callback parameters
 		url = self.__check_request_parameters(url, callback)
 		request = QtNetwork.QNetworkRequest(url)
+		self.__prepare_request(request)
 
 		# Add OAuth2 token
 		if not self.add_token(request):
@@ -541,6 +813,42 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 		)
 		return reply
 
+	def read_json(self, reply):
+		""" Returns the JSON body of a reply as a dict. The body is read and
+		parsed only once; later calls for the same reply (for instance from
+		both a callback and the functions it passes the reply on to) return the
+		same result. If the body was parsed in a worker thread already (see the
+		parseJSON option of get()), the result of that is returned.
+
+		Parameters
+		----------
+		reply : QtNetwork.QNetworkReply
+			The reply to read the body of
+
+		Returns
+		-------
+		dict : the parsed body
+
+		Raises
+		------
+		ValueError : if the body is not valid JSON
+		"""
+		if reply in self.parsed_replies:
+			result = self.parsed_replies[reply]
+		else:
+			try:
+				result = parse_json(reply.readAll())
+			except ValueError as e:
+				result = e
+			# Replies handled by this object are released by __release_reply()
+			# after their callbacks have been called. For others, the result
+			# can't be kept as it is unknown when they are done with.
+			if reply in self.active_replies:
+				self.parsed_replies[reply] = result
+		if isinstance(result, Exception):
+			raise result
+		return result
+
 	### Convenience HTTP Functions
 
 	def get_logged_in_user(self, callback, *args, **kwargs):
@@ -567,12 +875,16 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 		callback : function
 			The callback function to which the data should be delivered once the
 			request is finished
+		listing : bool (default: False)
+			If True, only the fields that the project tree uses are requested
+			(see osf.listing_url())
 
 		Returns
 		-------
 		QtNetwork.QNetworkReply or None if something went wrong
 		"""
-		api_call = osf.api_call("projects")
+		api_call = osf.api_call("projects",
+			listing=kwargs.pop("listing", False))
 		return self.get(api_call, callback, *args, **kwargs)
 
 	def get_project_repos(self, project_id, callback, *args, **kwargs):
@@ -586,12 +898,16 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 		callback : function
 			The callback function to which the data should be delivered once the
 			request is finished
+		listing : bool (default: False)
+			If True, only the fields that the project tree uses are requested
+			(see osf.listing_url())
 
 		Returns
 		-------
 		QtNetwork.QNetworkReply or None if something went wrong
 		"""
-		api_call = osf.api_call("project_repos", project_id)
+		api_call = osf.api_call("project_repos", project_id,
+			listing=kwargs.pop("listing", False))
 		return self.get(api_call, callback, *args, **kwargs)
 
 	def get_repo_files(self, project_id, repo_name, callback, *args, **kwargs):
@@ -609,12 +925,16 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 		callback : function
 			The callback function to which the data should be delivered once the
 			request is finished
+		listing : bool (default: False)
+			If True, only the fields that the project tree uses are requested
+			(see osf.listing_url())
 
 		Returns
 		-------
 		QtNetwork.QNetworkReply or None if something went wrong
 		"""
-		api_call = osf.api_call("repo_files",project_id, repo_name)
+		api_call = osf.api_call("repo_files",project_id, repo_name,
+			listing=kwargs.pop("listing", False))
 		return self.get(api_call, callback, *args, **kwargs)
 
 	def get_file_info(self, file_id, callback, *args, **kwargs):
@@ -662,6 +982,9 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 			should have two entries:
 			filename: The name of the file
 			filesize: the size of the file in bytes
+		transferProgress : callable (default: None)
+			Called with the progress, throughput and time remaining at a fixed
+			rate during the transfer (see get())
 		*args (optional)
 			Any other arguments that you want to have passed to the callback
 		**kwargs (optional)
@@ -680,6 +1003,9 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 			return
 		kwargs['destination'] = destination
 		kwargs['download_url'] = url
+		# Only report the progress of the download itself, not of the request
+		# for the user below
+		kwargs['_transferProgress'] = kwargs.pop('transferProgress', None)
 		# Extra call to get() to make sure OAuth2 token is still valid before download
 		# is initiated. If not, this way the request can be repeated after the user
 		# reauthenticates
@@ -710,6 +1036,9 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 			should have two entries:
 			filename: The name of the file
 			filesize: the size of the file in bytes
+		transferProgress : callable (default: None)
+			Called with the progress, throughput and time remaining at a fixed
+			rate during the transfer (see get())
 		*args (optional)
 			Any other arguments that you want to have passed to the callback
 		**kwargs (optional)
@@ -720,12 +1049,15 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 		# reauthenticates
 		kwargs['upload_url'] = url
 		kwargs['source_file'] = source_file
+		# Only report the progress of the upload itself
+		kwargs['_transferProgress'] = kwargs.pop('transferProgress', None)
 		self.get_logged_in_user(self.__upload, *args, **kwargs)
 
 	#--- PyQt Slots
 
 	def __reply_finished(self, callback, *args, **kwargs):
 		reply = self.sender()
+		self.active_replies.add(reply)
 		request = reply.request()
 		# Get the error callback function, if set
 		errorCallback = kwargs.get('errorCallback', None)
@@ -749,7 +1081,8 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 				# Don't show error notification if user manually cancelled operation.
 				# This is undesirable most of the time, and when it is required, it
 				# can be implemented by using the errorCallback function
-				if reply.error() != reply.OperationCanceledError:
+				if reply.error() != reply.OperationCanceledError and \
+					not kwargs.get('quiet', False):
 					self.error_message.emit(
 						str(reply.attribute(request.HttpStatusCodeAttribute)),
 						reply.errorString()
@@ -766,7 +1099,7 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 			# Call error callback, if set
 			if callable(errorCallback):
 				errorCallback(reply)
-			reply.deleteLater()
+			self.__release_reply(reply)
 			return
 
 		# For all other options that follow below, this request can be erased
@@ -774,23 +1107,26 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 		if not current_request_id is None:
 			self.pending_requests.pop(current_request_id, None)
 
-		# Check if the reply indicates a redirect
+		# Check if the reply indicates a redirect. Qt follows redirects of GET
+		# requests itself as of version 5.9 (see __prepare_request()), so this
+		# only happens for older versions.
 		if reply.attribute(request.HttpStatusCodeAttribute) in [301,302]:
 			# To prevent endless redirects, make a count of them and only
 			# allow a preset maximum
 			if kwargs['redirect_count'] < self.MAX_REDIRECTS:
 				kwargs['redirect_count'] += 1
 			else:
-				self.error_message.emit(
-					_("Whoops, something is going wrong"),
-					_("Too Many redirects")
-				)
+				if not kwargs.get('quiet', False):
+					self.error_message.emit(
+						_("Whoops, something is going wrong"),
+						_("Too Many redirects")
+					)
 				if callable(errorCallback):
 					errorCallback(reply)
 				# Close any remaining file handles that were created for upload
 				# or download
 				self.__close_file_handles(*args, **kwargs)
-				reply.deleteLater()
+				self.__release_reply(reply)
 				return
 			# Perform another request with the redirect_url and pass on the callback
 			redirect_url = reply.attribute(request.RedirectionTargetAttribute)
@@ -804,12 +1140,42 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 			kwargs.pop('redirect_count', None)
 			kwargs.pop('downloadProgress', None)
 			kwargs.pop('uploadProgress', None)
+			kwargs.pop('transferProgress', None)
 			kwargs.pop('readyRead', None)
 			kwargs.pop('errorCallback', None)
 			kwargs.pop('abortSignal', None)
+			kwargs.pop('headers', None)
+			kwargs.pop('priority', None)
+			kwargs.pop('readBufferSize', None)
+			kwargs.pop('quiet', None)
+			if kwargs.pop('parseJSON', False):
+				# The callback is called by __json_parsed() once the body has
+				# been parsed, which also cleans up the reply.
+				self.pending_callbacks[reply] = (callback, args, kwargs)
+				parser = JSONParser(reply, reply.readAll(), self.json_parsed)
+				QtCore.QThreadPool.globalInstance().start(parser)
+				return
 			callback(reply, *args, **kwargs)
 
-		# Cleanup, mark the reply object for deletion
+		self.__release_reply(reply)
+
+	def __json_parsed(self, reply, result):
+		""" Receives the results of JSONParser and passes the reply on to its
+		callback """
+		callback, args, kwargs = self.pending_callbacks.pop(reply)
+		self.parsed_replies[reply] = result
+		try:
+			callback(reply, *args, **kwargs)
+		finally:
+			self.__release_reply(reply)
+
+	def __release_reply(self, reply):
+		""" Discards the parsed body of the reply and marks the reply object
+		for deletion """
+		self.active_replies.discard(reply)
+		self.parsed_replies.pop(reply, None)
+		self.progress_trackers.pop(reply, None)
+		self.draining_replies.discard(reply)
 		reply.deleteLater()
 
 	def __create_progress_dialog(self, text, filesize):
@@ -830,12 +1196,53 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 		progress_dialog.hide()
 		progress_dialog.setLabelText(text)
 		progress_dialog.setMinimum(0)
-		progress_dialog.setMaximum(filesize)
+		# Files larger than 2 GB don't fit the range of the dialog, so their
+		# progress is shown in larger units
+		scale = filesize // self.max_progress_value + 1
+		progress_dialog.setProperty('progressScale', scale)
+		progress_dialog.setMaximum(filesize // scale)
 		return progress_dialog
 
-	def __transfer_progress(self, transfered, total):
-		""" callback for a reply object """
-		self.sender().property('progressDialog').setValue(transfered)
+	def __track_progress(self, reply, signal, dialog, callback):
+		""" Reports the progress of a transfer to a progress dialog and/or
+		callback at a fixed rate (see progress.TransferProgress)
+
+		Parameters
+		----------
+		reply : QtNetwork.QNetworkReply
+			The reply of the transfer
+		signal : QtCore.pyqtSignal
+			The downloadProgress or uploadProgress signal of the reply
+		dialog : QtWidgets.QProgressDialog
+			The dialog to show the progress in, or None
+		callback : callable
+			The transferProgress callback, or None
+		"""
+		if not isinstance(dialog, QtWidgets.QProgressDialog) and \
+			not callable(callback):
+			return
+		tracker = TransferProgress(self.progress_interval, parent=reply)
+		self.progress_trackers[reply] = tracker
+		signal.connect(tracker.update)
+		reply.finished.connect(tracker.finish)
+		if isinstance(dialog, QtWidgets.QProgressDialog):
+			label = dialog.labelText()
+			tracker.progress.connect(
+				lambda *progress: self.__transfer_progress(dialog, label,
+					*progress))
+		if callable(callback):
+			tracker.progress.connect(callback)
+
+	def __transfer_progress(self, dialog, label, transfered, total,
+		bytes_per_second, remaining):
+		""" Shows the progress reported by a TransferProgress in a dialog """
+		import humanize
+		dialog.setValue(transfered // (dialog.property('progressScale') or 1))
+		status = _("{}/s").format(humanize.naturalsize(bytes_per_second))
+		if not remaining is None:
+			status += ", " + _("{} remaining").format(
+				format_duration(remaining))
+		dialog.setLabelText(label + "\n" + status)
 
 	def __download(self, reply, download_url, *args, **kwargs):
 		""" The real download function, that is a callback for get_logged_in_user()
@@ -844,6 +1251,7 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 		tmp_file = QtCore.QTemporaryFile()
 		tmp_file.open(QtCore.QIODevice.WriteOnly)
 		kwargs['tmp_file'] = tmp_file
+		kwargs['transferProgress'] = kwargs.pop('_transferProgress', None)
 
 		progressDialog = kwargs.get('progressDialog', None)
 		if isinstance(progressDialog, dict):
@@ -854,10 +1262,10 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 				raise KeyError("progressDialog missing field {}".format(e))
 			progress_indicator = self.__create_progress_dialog(text, size)
 			kwargs['progressDialog'] = progress_indicator
-			kwargs['downloadProgress'] = self.__transfer_progress
 
 		# Callback function for when bytes are received
 		kwargs['readyRead'] = self.__download_readyRead
+		kwargs['readBufferSize'] = self.download_buffer_size
 		# Download the file with a get request
 		self.get(download_url, self.__download_finished, *args, **kwargs)
 
@@ -866,10 +1274,46 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 		written to a buffer. """
 
 		reply = self.sender()
-		data = reply.readAll()
 		if not 'tmp_file' in kwargs or not isinstance(kwargs['tmp_file'], QtCore.QTemporaryFile):
 			raise AttributeError('Missing file handle to write to')
-		kwargs['tmp_file'].write(data)
+		self.__write_download(reply, kwargs['tmp_file'],
+			self.download_chunks_per_pass)
+
+	def __write_download(self, reply, tmp_file, max_chunks=None):
+		""" Writes the data that has been received for a download to its file,
+		in chunks of download_chunk_size bytes. If more than max_chunks chunks
+		are available, the rest is written in the next pass of the event loop,
+		so that the GUI stays responsive. In the meantime, Qt receives at most
+		download_buffer_size bytes more.
+
+		Parameters
+		----------
+		reply : QtNetwork.QNetworkReply
+			The reply of the download
+		tmp_file : QtCore.QTemporaryFile
+			The file to write to
+		max_chunks : int (default: None)
+			The maximum number of chunks to write, or None to write all data
+			that is available
+		"""
+		chunks = 0
+		while reply.bytesAvailable() > 0:
+			if not max_chunks is None and chunks >= max_chunks:
+				if not reply in self.draining_replies:
+					self.draining_replies.add(reply)
+					QtCore.QTimer.singleShot(0, lambda: self.__continue_download(
+						reply, tmp_file))
+				return
+			tmp_file.write(reply.read(self.download_chunk_size))
+			chunks += 1
+
+	def __continue_download(self, reply, tmp_file):
+		""" Writes the next chunks of a download, unless it has finished in the
+		meantime """
+		if reply in self.draining_replies:
+			self.draining_replies.discard(reply)
+			self.__write_download(reply, tmp_file,
+				self.download_chunks_per_pass)
 
 	def __download_finished(self, reply, *args, **kwargs):
 		""" Callback for a reply object of a GET request, indicating that all
@@ -884,6 +1328,9 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 		if not 'tmp_file' in kwargs or not isinstance(kwargs['tmp_file'], QtCore.QTemporaryFile):
 			raise AttributeError("No valid reference to temp file where data was saved")
 
+		# Write the data that hasn't been written yet
+		self.draining_replies.discard(reply)
+		self.__write_download(reply, kwargs['tmp_file'])
 		kwargs['tmp_file'].close()
 		# If a file with the same name already exists at the location, try to
 		# delete it.
@@ -937,8 +1384,8 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 				raise KeyError("progressDialog is missing field {}".format(e))
 			progress_indicator = self.__create_progress_dialog(text, size)
 			kwargs['progressDialog'] = progress_indicator
-			kwargs['uploadProgress'] = self.__transfer_progress
 
+		kwargs['transferProgress'] = kwargs.pop('_transferProgress', None)
 		source_file.open(QtCore.QIODevice.ReadOnly)
 		self.put(upload_url, self.__upload_finished, data_to_send=source_file,
 			*args, **kwargs)
@@ -985,7 +1432,7 @@ class ConnectionManager(QtNetwork.QNetworkAccessManager):
 
 	def set_logged_in_user(self, user_data):
 		""" Callback function - Locally saves the data of the currently logged_in user """
-		self.logged_in_user = json.loads(safe_decode(user_data.readAll().data()))
+		self.logged_in_user = self.read_json(user_data)
 
 		# If user had any pending requests from previous login, execute them now
 		for (user_id, request) in self.pending_requests.values():
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Daniel Schreij
+
+This module is distributed under the Apache v2.0 License.
+You should have received a copy of the Apache v2.0 License
+along with this module. If not, see <http://www.apache.org/licenses/>.
+"""
+# Python3 compatibility
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import math
+import time
+
+from qtpy import QtCore
+
+def format_duration(seconds):
+	""" Formats a number of seconds as [h:]mm:ss """
+	minutes, seconds = divmod(int(round(seconds)), 60)
+	hours, minutes = divmod(minutes, 60)
+	if hours:
+		return "{}:{:02d}:{:02d}".format(hours, minutes, seconds)
+	return "{}:{:02d}".format(minutes, seconds)
+
+class TransferProgress(QtCore.QObject):
+	""" Collects the progress of a transfer, as reported by the
+	downloadProgress or uploadProgress signal of a QNetworkReply, and passes it
+	on at a fixed rate. On fast connections these signals are emitted thousands
+	of times per second, which is far more often than a progress dialog can be
+	repainted. Along with the progress, the throughput (smoothed with an
+	exponential moving average) and the estimated time remaining are
+	reported. """
+
+	# Emitted at most once per interval with the number of bytes transferred,
+	# the total number of bytes (-1 if unknown), the throughput in bytes per
+	# second and the estimated number of seconds remaining (None if unknown)
+	progress = QtCore.pyqtSignal(object, object, float, object)
+
+	def __init__(self, interval=100, time_constant=2.0, parent=None):
+		""" Constructor
+
+		Parameters
+		----------
+		interval : int (default: 100)
+			The number of milliseconds between reports (100 is 10 Hz)
+		time_constant : float (default: 2.0)
+			The number of seconds over which the throughput is averaged. Larger
+			values give a steadier throughput and time remaining, but react
+			slower to changes in speed.
+		parent : QtCore.QObject (default: None)
+			The parent of this object, such as the reply of the transfer
+		"""
+		super(TransferProgress, self).__init__(parent)
+		self.time_constant = time_constant
+		self.timer = QtCore.QTimer(self)
+		self.timer.setInterval(interval)
+		self.timer.timeout.connect(self.report)
+		self.transferred = 0
+		self.total = -1
+		self.bytes_per_second = None
+		# The moment and number of bytes of the previous report
+		self.last_time = None
+		self.last_transferred = 0
+
+	def update(self, transferred, total):
+		""" Records the progress of the transfer. It is reported on the next
+		tick of the timer. This slot can be connected to the downloadProgress
+		and uploadProgress signals of a QNetworkReply. """
+		self.transferred = transferred
+		self.total = total
+		if self.last_time is None:
+			self.last_time = time.time()
+			self.last_transferred = transferred
+			self.timer.start()
+
+	def report(self):
+		""" Updates the throughput and emits the progress """
+		if self.last_time is None:
+			return
+		now = time.time()
+		elapsed = now - self.last_time
+		if elapsed > 0:
+			speed = (self.transferred - self.last_transferred) / elapsed
+			if self.bytes_per_second is None:
+				self.bytes_per_second = speed
+			else:
+				# The weight of the new measurement depends on the time it
+				# covers, so delayed timer ticks don't distort the average
+				weight = 1 - math.exp(-elapsed / self.time_constant)
+				self.bytes_per_second += weight * (speed - self.bytes_per_second)
+			self.last_time = now
+			self.last_transferred = self.transferred
+		self.progress.emit(self.transferred, self.total,
+			self.bytes_per_second or 0.0, self.remaining())
+
+	def remaining(self):
+		""" Returns the estimated number of seconds until the transfer is
+		complete, or None if it can't be estimated """
+		if self.total < 0:
+			return None
+		left = max(self.total - self.transferred, 0)
+		if not left:
+			return 0.0
+		if not self.bytes_per_second:
+			return None
+		return left / self.bytes_per_second
+
+	def finish(self):
+		""" Stops the timer and reports the final progress. This slot can be
+		connected to the finished signal of a QNetworkReply. """
+		if self.timer.isActive():
+			self.timer.stop()
+			self.report()
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Daniel Schreij
+
+This module is distributed under the Apache v2.0 License.
+You should have received a copy of the Apache v2.0 License
+along with this module. If not, see <http://www.apache.org/licenses/>.
+"""
+# Python3 compatibility
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+#OSF modules
+import QOpenScienceFramework.connection as osf
+
+class PartialJSON(dict):
+	""" A section (such as the attributes) of the JSON representation of an
+	entry, as reconstructed by ItemRecord. Fields that are not kept by the
+	record raise a KeyError that says so, also when they are looked up with
+	get(), so that they don't silently appear to be missing. """
+
+	def __init__(self, section, fields, values):
+		""" Constructor
+
+		Parameters
+		----------
+		section : str
+			The name of the section, for error messages
+		fields : iterable
+			All fields of the section that are kept by the record, including
+			those without a value in values
+		values : dict
+			The values of the fields
+		"""
+		super(PartialJSON, self).__init__(values)
+		self.section = section
+		self.fields = frozenset(fields)
+
+	def __missing__(self, key):
+		if key in self.fields:
+			raise KeyError(key)
+		raise KeyError("'{}' is not in the {} kept by ItemRecord. The full "
+			"JSON representation can be retrieved from its info_url (see "
+			"ProjectTree.load_item_data())".format(key, self.section))
+
+	def get(self, key, default=None):
+		if key in self or key in self.fields:
+			return super(PartialJSON, self).get(key, default)
+		return self[key]
+
+class ItemRecord(object):
+	""" A compact representation of a node (project) or file entry received
+	from the OSF API. Only the fields that the widgets actually use are kept;
+	the attributes, links and relationships that are part of the full JSON
+	representation are discarded. The full representation can be retrieved
+	again at any time from the url stored in info_url.
+
+	For backwards compatibility, a record can still be indexed as if it was
+	the JSON dictionary it was created from (e.g. record['attributes']['name']),
+	but the dictionaries returned this way are reconstructed on the fly and
+	only contain the fields kept by the record. Looking up any other field
+	raises a KeyError (see PartialJSON).
+	"""
+
+	__slots__ = ('id', 'type', 'name', 'kind', 'provider', 'size',
+		'date_created', 'date_modified', 'info_url', 'files_url',
+		'download_url', 'upload_url', 'delete_url', 'new_folder_url')
+
+	def __init__(self, id, type, name, kind, provider=None, size=None,
+		date_created=None, date_modified=None, info_url=None, files_url=None,
+		download_url=None, upload_url=None, delete_url=None,
+		new_folder_url=None):
+		""" Constructor. Use ItemRecord.from_json() to create a record from an
+		entry in an OSF API response. """
+		self.id = id
+		self.type = type
+		self.name = name
+		self.kind = kind
+		self.provider = provider
+		self.size = size
+		self.date_created = date_created
+		self.date_modified = date_modified
+		self.info_url = info_url
+		self.files_url = files_url
+		self.download_url = download_url
+		self.upload_url = upload_url
+		self.delete_url = delete_url
+		self.new_folder_url = new_folder_url
+
+	@classmethod
+	def from_json(cls, data):
+		""" Creates a record from a single entry of the data list in an OSF API
+		response.
+
+		Parameters
+		----------
+		data : dict
+			The JSON representation of the node or file
+
+		Returns
+		-------
+		ItemRecord : the compact record for this entry
+
+		Raises
+		------
+		osf.OSFInvalidResponse : if the entry does not have the expected structure
+		"""
+		try:
+			attributes = data['attributes']
+			links = data.get('links', {})
+			if data['type'] == 'nodes':
+				name = attributes['title']
+				kind = attributes['category']
+			else:
+				name = attributes['name']
+				kind = attributes['kind']
+		except KeyError as e:
+			raise osf.OSFInvalidResponse("Invalid structure for OSF entry: {}"\
+				.format(e))
+
+		try:
+			files_url = data['relationships']['files']['links']['related']\
+				['href']
+		except (KeyError, TypeError):
+			files_url = None
+
+		return cls(
+			data['id'],
+			data['type'],
+			name,
+			kind,
+			provider=attributes.get('provider'),
+			size=attributes.get('size'),
+			date_created=attributes.get('date_created'),
+			date_modified=attributes.get('date_modified'),
+			info_url=links.get('info', links.get('self')),
+			files_url=files_url,
+			download_url=links.get('download'),
+			upload_url=links.get('upload'),
+			delete_url=links.get('delete'),
+			new_folder_url=links.get('new_folder'),
+		)
+
+	@classmethod
+	def wrap(cls, data):
+		""" Returns data as an ItemRecord. Records are returned as is, JSON
+		dictionaries are converted with from_json(). """
+		if isinstance(data, cls):
+			return data
+		return cls.from_json(data)
+
+	@property
+	def is_node(self):
+		""" True if this record represents a node (i.e. a project) """
+		return self.type == 'nodes'
+
+	def to_json(self):
+		""" Reconstructs the (partial) JSON representation of this record.
+
+		Returns
+		-------
+		dict : with the id, type, attributes, links and relationships entries.
+		"""
+		return {
+			'id': self.id,
+			'type': self.type,
+			'attributes': self.__attributes(),
+			'links': self.__links(),
+			'relationships': self.__relationships(),
+		}
+
+	def __attributes(self):
+		if self.is_node:
+			attributes = {'title': self.name, 'category': self.kind}
+		else:
+			attributes = {'name': self.name, 'kind': self.kind,
+				'provider': self.provider, 'size': self.size}
+		attributes['date_created'] = self.date_created
+		attributes['date_modified'] = self.date_modified
+		return PartialJSON('attributes', attributes, attributes)
+
+	def __links(self):
+		links = {
+			'download': self.download_url,
+			'upload': self.upload_url,
+			'delete': self.delete_url,
+			'new_folder': self.new_folder_url,
+		}
+		links['self' if self.is_node else 'info'] = self.info_url
+		return PartialJSON('links', links,
+			dict((key, url) for key, url in links.items() if url))
+
+	def __relationships(self):
+		relationships = {}
+		if self.files_url:
+			relationships['files'] = {'links': {'related':
+				{'href': self.files_url}}}
+		return PartialJSON('relationships', ['files'], relationships)
+
+	# Dictionary style access for backwards compatibility
+
+	def __getitem__(self, key):
+		if key == 'id':
+			return self.id
+		if key == 'type':
+			return self.type
+		if key == 'attributes':
+			return self.__attributes()
+		if key == 'links':
+			return self.__links()
+		if key == 'relationships':
+			return self.__relationships()
+		raise KeyError("'{}' is not kept by ItemRecord. The full JSON "
+			"representation can be retrieved from its info_url (see "
+			"ProjectTree.load_item_data())".format(key))
+
+	def __contains__(self, key):
+		return key in ('id', 'type', 'attributes', 'links', 'relationships')
+
+	def get(self, key, default=None):
+		# All entries that the record keeps are always present, and others
+		# raise a KeyError just like with indexing (see PartialJSON)
+		return self[key]
+
+	def __repr__(self):
+		return '<ItemRecord {} {} ({})>'.format(self.type, self.id, self.name)
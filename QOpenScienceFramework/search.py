@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Daniel Schreij
+
+This module is distributed under the Apache v2.0 License.
+You should have received a copy of the Apache v2.0 License
+along with this module. If not, see <http://www.apache.org/licenses/>.
+"""
+# Python3 compatibility
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+class SearchIndex(object):
+	""" An in-memory index for searching items by (part of) their name or path.
+	Names are indexed by their trigrams for substring searches, and by their
+	first one and two characters for very short queries. The index is
+	incremental: items can be added and removed at any time.
+
+	Items are identified by a key (e.g. the OSF id) and have a parent key, so
+	that their path can be reconstructed without storing it for every item.
+	"""
+
+	def __init__(self):
+		""" Constructor """
+		self.clear()
+
+	@staticmethod
+	def trigrams(text):
+		""" Returns the set of trigrams in text """
+		return set(text[i:i+3] for i in range(len(text)-2))
+
+	def clear(self):
+		""" Removes all items from the index """
+		# key -> (lowercase name, parent key)
+		self.entries = {}
+		# trigram -> set of keys
+		self.trigram_index = {}
+		# first one or two characters -> set of keys
+		self.prefix_index = {}
+
+	def __grams(self, name):
+		""" Returns all trigrams and prefixes of name under which it is
+		indexed """
+		return self.trigrams(name), set([name[:1], name[:2]])
+
+	def add(self, key, name, parent_key=None):
+		""" Adds an item to the index. If an item with the same key is present
+		already, it is replaced.
+
+		Parameters
+		----------
+		key : hashable
+			The key that identifies the item
+		name : str
+			The name of the item
+		parent_key : hashable (default: None)
+			The key of the parent of the item, or None for top level items.
+		"""
+		if key in self.entries:
+			self.remove(key)
+		name = name.lower()
+		self.entries[key] = (name, parent_key)
+		trigrams, prefixes = self.__grams(name)
+		for gram in trigrams:
+			self.trigram_index.setdefault(gram, set()).add(key)
+		for prefix in prefixes:
+			self.prefix_index.setdefault(prefix, set()).add(key)
+
+	def remove(self, key):
+		""" Removes an item from the index (if it is present) """
+		entry = self.entries.pop(key, None)
+		if entry is None:
+			return
+		trigrams, prefixes = self.__grams(entry[0])
+		for index, grams in ((self.trigram_index, trigrams),
+			(self.prefix_index, prefixes)):
+			for gram in grams:
+				keys = index.get(gram)
+				if keys is None:
+					continue
+				keys.discard(key)
+				if not keys:
+					del index[gram]
+
+	def path(self, key):
+		""" Returns the path of the item with key, consisting of the names of
+		the item and all its ancestors separated by slashes (in lowercase). """
+		parts = []
+		while key in self.entries:
+			name, key = self.entries[key]
+			parts.append(name)
+		return '/'.join(reversed(parts))
+
+	def __candidates(self, query):
+		""" Returns the keys of the items of which the name may contain
+		query """
+		if len(query) < 3:
+			return self.prefix_index.get(query, set())
+		# Intersect starting with the smallest set to keep this fast
+		sets = sorted((self.trigram_index.get(gram, set())
+			for gram in self.trigrams(query)), key=len)
+		candidates = set(sets[0])
+		for keys in sets[1:]:
+			candidates &= keys
+			if not candidates:
+				break
+		return candidates
+
+	def search(self, query, limit=100):
+		""" Searches the index for items of which the name contains query. If
+		the query contains slashes, the last part of the query is matched
+		against the names, and the full query against the paths of the items.
+
+		For queries of one or two characters, only names starting with the
+		query are found.
+
+		Parameters
+		----------
+		query : str
+			The text to search for (case insensitive)
+		limit : int (default: 100)
+			The maximum number of results to return
+
+		Returns
+		-------
+		list : the keys of the matching items. Exact matches come first,
+		followed by names starting with the query and then the other matches.
+		Shorter names go before longer ones.
+		"""
+		query = query.strip().lower()
+		name_query = query.rstrip('/').rsplit('/', 1)[-1]
+		if not name_query:
+			return []
+
+		results = []
+		for key in self.__candidates(name_query):
+			name = self.entries[key][0]
+			if not name_query in name:
+				continue
+			if name_query != query and not query.strip('/') in self.path(key):
+				continue
+			if name == name_query:
+				rank = 0
+			elif name.startswith(name_query):
+				rank = 1
+			else:
+				rank = 2
+			results.append((rank, len(name), name, key))
+		results.sort(key=lambda result: result[:3])
+		return [result[3] for result in results[:limit]]
+
+	def __len__(self):
+		return len(self.entries)
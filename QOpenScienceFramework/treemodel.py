@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Daniel Schreij
+
+This module is distributed under the Apache v2.0 License.
+You should have received a copy of the Apache v2.0 License
+along with this module. If not, see <http://www.apache.org/licenses/>.
+"""
+# Python3 compatibility
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+
+# OSF modules
+import QOpenScienceFramework.connection as osf
+from QOpenScienceFramework.records import ItemRecord
+# Python 2 and 3 compatiblity settings
+from QOpenScienceFramework.compat import *
+# PyQt modules
+from qtpy import QtCore, QtNetwork
+
+class TreeNode(object):
+	""" A node in the store backing ProjectTreeModel. Holds the compact record
+	of the OSF entry it represents and the bookkeeping required for the model,
+	such as its position in the parent and the url of the next page of
+	children that still has to be retrieved. """
+
+	__slots__ = ('record', 'parent', 'children', 'by_name', 'row', 'next_url',
+		'fetching', 'expanded')
+
+	def __init__(self, record=None, parent=None):
+		""" Constructor
+
+		Parameters
+		----------
+		record : ItemRecord (default: None)
+			The record of the node or file. The root of the tree has no record.
+		parent : TreeNode (default: None)
+			The parent of this node.
+		"""
+		self.record = record
+		self.parent = parent
+		self.row = 0
+		if self.is_container:
+			self.children = []
+			# Children by their name, for constant time lookups. Siblings can
+			# have the same name (e.g. a component and a storage provider), so
+			# each name maps to a list of children.
+			self.by_name = {}
+			# The url of the next page of children to retrieve. None means all
+			# children have been retrieved.
+			self.next_url = None if record is None else record.files_url
+		else:
+			# Files can't have children, so don't spend memory on them
+			self.children = ()
+			self.by_name = None
+			self.next_url = None
+		self.fetching = False
+		self.expanded = False
+
+	def child_named(self, name, kind=None):
+		""" Returns the first child with the given name (and kind, if
+		specified), or None if there is no such child """
+		if self.by_name is None:
+			return None
+		for child in self.by_name.get(name, ()):
+			if kind is None or child.record.kind == kind:
+				return child
+		return None
+
+	@property
+	def is_container(self):
+		""" True if this node can have children (i.e. it is a project or
+		folder) """
+		if self.record is None:
+			return True
+		return self.record.is_node or self.record.kind == 'folder'
+
+class ProjectTreeModel(QtCore.QAbstractItemModel):
+	""" An item model of the projects and files on the OSF of the current user.
+	Children of projects and folders are retrieved lazily, one page at a time,
+	when a view asks for them through canFetchMore() and fetchMore(). """
+
+	# Emitted when all requests that were in progress are finished
+	loadingFinished = QtCore.pyqtSignal()
+
+	# The column headers of the model
+	columns = ["Name", "Kind", "Size"]
+
+	def __init__(self, manager, icon_provider=None, parent=None):
+		""" Constructor
+
+		Parameters
+		----------
+		manager : manger.ConnectionManager
+			The object taking care of all the communication with the OSF
+		icon_provider : callable (default: None)
+			A function that takes the kind and name of an item and returns the
+			QtGui.QIcon to show for it. If not specified, items have no icon.
+		parent : QtCore.QObject (default: None)
+			The parent of this model
+		"""
+		super(ProjectTreeModel, self).__init__(parent)
+		self.manager = manager
+		self.icon_provider = icon_provider
+		self.root = TreeNode()
+		# The column and order to sort by, or None if sorting is disabled
+		self.sort_column = None
+		self.sort_order = QtCore.Qt.AscendingOrder
+		# Replies of page requests that are still in progress
+		self.active_requests = []
+
+	### Private functions
+
+	def __sort_key(self, column):
+		""" Returns the key function to sort nodes by for the given column """
+		if column == 1:
+			return lambda node: (node.record.kind or '').lower()
+		if column == 2:
+			return lambda node: node.record.size or -1
+		return lambda node: node.record.name.lower()
+
+	def __sort_children(self, parents):
+		""" Sorts the children of the passed nodes according to the current
+		sort column, and updates the persistent indexes accordingly """
+		if self.sort_column is None:
+			return
+		self.layoutAboutToBeChanged.emit()
+		key = self.__sort_key(self.sort_column)
+		reverse = self.sort_order == QtCore.Qt.DescendingOrder
+		for node in parents:
+			node.children.sort(key=key, reverse=reverse)
+			for row, child in enumerate(node.children):
+				child.row = row
+		# Rows are stored on the nodes themselves, so the new position of each
+		# persistent index can be read from its node.
+		old_indexes = self.persistentIndexList()
+		new_indexes = [self.createIndex(index.internalPointer().row,
+			index.column(), index.internalPointer()) for index in old_indexes]
+		self.changePersistentIndexList(old_indexes, new_indexes)
+		self.layoutChanged.emit()
+
+	def __insert_records(self, node, records):
+		""" Appends the passed records as children of node """
+		if not records:
+			return []
+		first = len(node.children)
+		self.beginInsertRows(self.index_for_node(node), first,
+			first + len(records) - 1)
+		new_nodes = []
+		for row, record in enumerate(records, first):
+			child = TreeNode(record, node)
+			child.row = row
+			node.children.append(child)
+			node.by_name.setdefault(record.name, []).append(child)
+			new_nodes.append(child)
+		self.endInsertRows()
+		self.__sort_children([node])
+		return new_nodes
+
+	def __request_finished(self, reply):
+		""" Removes the reply from the active requests and signals if all
+		requests are finished """
+		try:
+			self.active_requests.remove(reply)
+		except ValueError:
+			# The request was issued before the model was cleared
+			logging.info("Reply not found in active requests")
+			return
+		if not self.active_requests:
+			self.loadingFinished.emit()
+
+	def __add_listing(self, node, listing):
+		""" Adds the entries of a (page of a) listing as children of node. The
+		listings of the children of these entries may be embedded in it (see
+		osf.listing_url()), in which case these are added as well. """
+		node.next_url = listing.get('links', {}).get('next')
+		entries = listing['data']
+		new_nodes = self.__insert_records(node,
+			[ItemRecord.from_json(entry) for entry in entries])
+		for child, entry in zip(new_nodes, entries):
+			embedded = osf.embedded_listing(entry, 'files')
+			if not embedded is None:
+				self.__add_listing(child, embedded)
+		# Without children, the expansion indicator should disappear
+		if not node.children and not node is self.root:
+			index = self.index_for_node(node)
+			self.dataChanged.emit(index, index)
+
+	def __page_received(self, reply, node):
+		""" Callback for fetchMore(). Adds the received page of children to
+		node. """
+		node.fetching = False
+		if self.is_attached(node):
+			self.__add_listing(node, self.manager.read_json(reply))
+		self.__request_finished(reply)
+
+	def __page_error(self, reply, node, url):
+		""" Error callback for fetchMore(). If the request failed because the
+		OSF does not support embedding in it, it is repeated without
+		embedding. """
+		node.fetching = False
+		status = reply.attribute(QtNetwork.QNetworkRequest.HttpStatusCodeAttribute)
+		stripped = osf.strip_embed(url)
+		if status == 400 and not stripped is None:
+			if self.is_attached(node):
+				node.next_url = stripped
+				self.fetchMore(self.index_for_node(node))
+		elif not stripped is None and \
+			reply.error() != reply.OperationCanceledError:
+			self.manager.error_message.emit(str(status), reply.errorString())
+		self.__request_finished(reply)
+
+	### Reimplemented functions of QAbstractItemModel
+
+	def index(self, row, column, parent=QtCore.QModelIndex()):
+		node = self.node(parent)
+		if row < 0 or row >= len(node.children) or \
+			column < 0 or column >= len(self.columns):
+			return QtCore.QModelIndex()
+		return self.createIndex(row, column, node.children[row])
+
+	def parent(self, index=None):
+		# QObject.parent() is shadowed by this function, so pass it on if
+		# no index is specified.
+		if index is None:
+			return super(ProjectTreeModel, self).parent()
+		if not index.isValid():
+			return QtCore.QModelIndex()
+		parent_node = index.internalPointer().parent
+		if parent_node is None or parent_node is self.root:
+			return QtCore.QModelIndex()
+		return self.createIndex(parent_node.row, 0, parent_node)
+
+	def rowCount(self, parent=QtCore.QModelIndex()):
+		if parent.column() > 0:
+			return 0
+		return len(self.node(parent).children)
+
+	def columnCount(self, parent=QtCore.QModelIndex()):
+		return len(self.columns)
+
+	def hasChildren(self, parent=QtCore.QModelIndex()):
+		node = self.node(parent)
+		if not node.is_container:
+			return False
+		return bool(node.children) or not node.next_url is None
+
+	def canFetchMore(self, parent):
+		node = self.node(parent)
+		return not node.next_url is None and not node.fetching
+
+	def fetchMore(self, parent):
+		node = self.node(parent)
+		if node.next_url is None or node.fetching:
+			return
+		node.fetching = True
+		url = osf.listing_url(node.next_url)
+		req = self.manager.get(
+			url,
+			self.__page_received,
+			node,
+			errorCallback=lambda reply: self.__page_error(reply, node, url),
+			parseJSON=True,
+			# Errors of requests with embedding are reported by __page_error(),
+			# unless the request is retried without it
+			quiet=not osf.strip_embed(url) is None
+		)
+		# If something went wrong, req should be None
+		if req:
+			self.active_requests.append(req)
+		else:
+			node.fetching = False
+
+	def data(self, index, role=QtCore.Qt.DisplayRole):
+		if not index.isValid():
+			return None
+		node = index.internalPointer()
+		record = node.record
+		column = index.column()
+		if role == QtCore.Qt.DisplayRole:
+			if column == 0:
+				return record.name
+			if column == 1:
+				return record.kind
+			if column == 2 and record.size:
+				# Imported here, as it is only needed once files are shown
+				import humanize
+				return humanize.naturalsize(record.size)
+			return None
+		if role == QtCore.Qt.DecorationRole and column == 0 and \
+			callable(self.icon_provider):
+			kind = record.kind
+			if not record.is_node and kind == 'folder' and node.expanded:
+				kind = 'folder-open'
+			return self.icon_provider(kind, record.name)
+		if role == QtCore.Qt.UserRole:
+			return record
+		return None
+
+	def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+		if orientation == QtCore.Qt.Horizontal and \
+			role == QtCore.Qt.DisplayRole:
+			return self.columns[section]
+		return None
+
+	def sort(self, column, order=QtCore.Qt.AscendingOrder):
+		self.sort_column = column
+		self.sort_order = order
+		self.__sort_children([node for node in self.iter_nodes()
+			if node.children] + [self.root])
+
+	### Public functions
+
+	def node(self, index):
+		""" Returns the TreeNode for index, or the root node if the index is
+		invalid """
+		if index is None or not index.isValid():
+			return self.root
+		return index.internalPointer()
+
+	def is_attached(self, node):
+		""" Checks if node is still part of the tree (and not removed, or
+		discarded by a clear() in the mean time) """
+		while not node.parent is None:
+			node = node.parent
+		return node is self.root
+
+	def record(self, index):
+		""" Returns the ItemRecord for index, or None for the root """
+		return self.node(index).record
+
+	def index_for_node(self, node, column=0):
+		""" Returns the model index of node """
+		if node is None or node is self.root:
+			return QtCore.QModelIndex()
+		return self.createIndex(node.row, column, node)
+
+	def iter_nodes(self, node=None):
+		""" Iterates depth-first over all nodes that have been retrieved so far,
+		below node (or the root if not specified). """
+		stack = list(reversed((node or self.root).children))
+		while stack:
+			current = stack.pop()
+			yield current
+			stack.extend(reversed(current.children))
+
+	def find_child(self, parent, name, kind=None):
+		""" Returns the index of the direct child of parent with the given
+		name (and kind, if specified), or an invalid QModelIndex if there is
+		none. """
+		child = self.node(parent).child_named(name, kind)
+		if child is None:
+			return QtCore.QModelIndex()
+		return self.index_for_node(child)
+
+	def resolve_path(self, path, parent=None):
+		""" Returns the index of the item at the specified path (e.g.
+		osfstorage/data/sub01/run1.csv) relative to parent, or an invalid
+		QModelIndex if no such item has been retrieved. """
+		node = self.node(parent)
+		for name in path.strip('/').split('/'):
+			node = node.child_named(name)
+			if node is None:
+				return QtCore.QModelIndex()
+		return self.index_for_node(node)
+
+	def set_root_url(self, url, embed=None):
+		""" Clears the model and starts retrieving the top level of the tree
+		from the specified url.
+
+		Parameters
+		----------
+		url : str
+			The api endpoint listing the top level items (usually the nodes
+			of the logged in user)
+		embed : str (default: None)
+			The relationship of the top level items of which the first page
+			is retrieved along with them (see osf.listing_url()), e.g. "files"
+			for the storage providers of projects.
+		"""
+		self.clear()
+		self.root.next_url = osf.listing_url(url, embed)
+		self.fetchMore(QtCore.QModelIndex())
+
+	def clear(self):
+		""" Removes all nodes from the model """
+		self.beginResetModel()
+		self.root = TreeNode()
+		self.active_requests = []
+		self.endResetModel()
+
+	def add_record(self, parent, data):
+		""" Adds a single item below parent, for instance after an upload.
+
+		Parameters
+		----------
+		parent : QtCore.QModelIndex
+			The index of the item to add the new item to.
+		data : dict or ItemRecord
+			The JSON representation of the node or file, or a record thereof
+
+		Returns
+		-------
+		QtCore.QModelIndex : the index of the new item
+		"""
+		node = self.node(parent)
+		new_node = self.__insert_records(node, [ItemRecord.wrap(data)])[0]
+		return self.index_for_node(new_node)
+
+	def remove_item(self, index):
+		""" Removes the item at index (and its children) from the model. """
+		node = self.node(index)
+		if node is self.root:
+			return
+		parent_node = node.parent
+		self.beginRemoveRows(self.parent(index), node.row, node.row)
+		del parent_node.children[node.row]
+		for row in range(node.row, len(parent_node.children)):
+			parent_node.children[row].row = row
+		siblings = parent_node.by_name.get(node.record.name, [])
+		if node in siblings:
+			siblings.remove(node)
+			if not siblings:
+				del parent_node.by_name[node.record.name]
+		node.parent = None
+		self.endRemoveRows()
+
+	def set_expanded(self, index, expanded):
+		""" Stores the expansion state of the item at index, so that the
+		matching (open or closed) folder icon is shown for it """
+		node = self.node(index)
+		if node is self.root or node.expanded == expanded:
+			return
+		node.expanded = expanded
+		self.dataChanged.emit(index, index)
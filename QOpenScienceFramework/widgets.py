@@ -13,31 +13,36 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import os
+import re
 import sys
+import csv
 import json
 import logging
 import webbrowser
+from collections import deque
 logging.basicConfig(level=logging.INFO)
 
-# QtAwesome icon fonts for spinners
-import qtawesome as qta
 # OSF connection interface
 import QOpenScienceFramework.connection as osf
-# Fileinspector for determining filetypes
-import fileinspector
-# For presenting numbers in human readible formats
-import humanize
-# For better time functions
-import arrow
+# Compact representation of OSF entries stored in the tree items
+from QOpenScienceFramework.records import ItemRecord
+# Item model for the model/view based project tree
+from QOpenScienceFramework import treemodel
+# Index for searching items by name
+from QOpenScienceFramework.search import SearchIndex
+# Fileinspector for determining filetypes (cached by extension)
+from QOpenScienceFramework import filetypes
+# Caches for image previews
+from QOpenScienceFramework.cache import LRUCache, DiskCache
+# QtAwesome (icon fonts for spinners), humanize (for presenting numbers in
+# human readible formats) and arrow (for better time functions) take a while to
+# import, so they are only imported when they are first needed.
 # Unix style filename matching
 import fnmatch
 # QT classes
 # Required QT classes
 from qtpy import QtGui, QtCore, QtWidgets, QtNetwork
 
-import pprint
-pp = pprint.PrettyPrinter(indent=2)
-
 # Python 2 and 3 compatiblity settings
 from QOpenScienceFramework.compat import *
 from QOpenScienceFramework import dirname
@@ -47,6 +52,37 @@ osf_blacklogo_path = os.path.join(dirname, 'img/cos-black.png')
 # Dummy function later to be replaced for translation
 _ = lambda s: s
 
+def theme_icon(name, fallback):
+	""" Returns the icon called name from the current icon theme, or the
+	QtAwesome icon called fallback if the theme doesn't have it """
+	if QtGui.QIcon.hasThemeIcon(name):
+		return QtGui.QIcon.fromTheme(name)
+	import qtawesome as qta
+	return qta.icon(fallback)
+
+def cache_location(name):
+	""" Returns the path of the folder called name in the cache folder of the
+	current user (e.g. ~/.cache on Linux). Cached previews and avatars are
+	stored there rather than in the shared temporary folder, as they may show
+	the contents of private projects. """
+	location = QtCore.QStandardPaths.writableLocation(
+		QtCore.QStandardPaths.CacheLocation)
+	if not location:
+		location = os.path.join(os.path.expanduser('~'), '.cache')
+	return os.path.join(safe_decode(location), 'QOpenScienceFramework', name)
+
+# The icons resolved by ProjectTree.get_icon(), shared by all trees, and the
+# icon theme they were resolved with
+_icon_cache = {}
+_icon_cache_theme = None
+
+def clear_icon_cache():
+	""" Discards all icons cached by ProjectTree.get_icon(). This happens
+	automatically when the icon theme or its search paths change. """
+	global _icon_cache_theme
+	_icon_cache.clear()
+	_icon_cache_theme = None
+
 def check_if_opensesame_file(filename, os3_only=False):
 	""" Checks if the passed file is an OpenSesame file, based on its extension.
 
@@ -73,6 +109,45 @@ def check_if_opensesame_file(filename, os3_only=False):
 		return True
 	return False
 
+def compile_filter(patterns):
+	""" Compiles one or more Unix style filename patterns (as used by fnmatch)
+	into a single regular expression.
+
+	Parameters
+	----------
+	patterns : str or list
+		The pattern or list of patterns (e.g. ['*.osexp', '*.opensesame'])
+
+	Returns
+	-------
+	re.RegexObject : the expression matching filenames that match any of the
+	patterns. Like fnmatch, it ignores case only if the filesystem does.
+	"""
+	if isinstance(patterns, basestring):
+		patterns = [patterns]
+	flags = re.IGNORECASE if os.path.normcase('A') == 'a' else 0
+	return re.compile('|'.join(fnmatch.translate(pattern)
+		for pattern in patterns), flags)
+
+def filter_extensions(patterns):
+	""" Returns the extensions of the patterns that match on extension only
+	(e.g. *.osexp), in the format returned by extension_key(). If any of the
+	patterns is more complex than that, None is returned. """
+	if isinstance(patterns, basestring):
+		patterns = [patterns]
+	extensions = set()
+	for pattern in patterns:
+		ext = pattern[1:]
+		if not pattern.startswith('*.') or '.' in ext[1:] or \
+			any(char in ext for char in '*?[/\\'):
+			return None
+		extensions.add(os.path.normcase(ext))
+	return extensions
+
+def extension_key(filename):
+	""" Returns the extension of filename as used to index tree items """
+	return os.path.normcase(os.path.splitext(filename)[1])
+
 class UserBadge(QtWidgets.QWidget):
 	""" A Widget showing the logged in user """
 
@@ -80,8 +155,10 @@ class UserBadge(QtWidgets.QWidget):
 	# Login and logout events
 	logout_request = QtCore.pyqtSignal()
 	login_request = QtCore.pyqtSignal()
+	# The number of bytes the avatars stored on disk may take up
+	avatar_cache_budget = 5*1024**2
 
-	def __init__(self, manager, icon_size=None):
+	def __init__(self, manager, icon_size=None, avatar_dir=None):
 		""" Constructor
 
 		Parameters
@@ -91,6 +168,10 @@ class UserBadge(QtWidgets.QWidget):
 		iconsize : QtCore.QSize (default: None)
 			The size of the icon to use for the osf logo and user photo, if not
 			passed a size of 40x40 is used.
+		avatar_dir : string (default: None)
+			The folder in which the avatars of users are stored, so they can be
+			shown right away on the next login. If not specified, a folder in
+			the cache folder of the user is used (see cache_location()).
 		"""
 		super(UserBadge, self).__init__()
 
@@ -101,6 +182,9 @@ class UserBadge(QtWidgets.QWidget):
 		self.logging_out_text = _("Logging out")
 
 		self.manager = manager
+		if avatar_dir is None:
+			avatar_dir = cache_location('avatars')
+		self.avatar_cache = DiskCache(avatar_dir, self.avatar_cache_budget)
 		if isinstance(icon_size, QtCore.QSize):
 			# Size of avatar and osf logo display image
 			self.icon_size = icon_size
@@ -135,6 +219,7 @@ class UserBadge(QtWidgets.QWidget):
 		self.user_button.setFlat(True)
 
 		# Spinner icon
+		import qtawesome as qta
 		self.spinner = qta.icon('fa.refresh', color='green',
 					 animation=qta.Spin(self.login_button))
 
@@ -200,10 +285,11 @@ class UserBadge(QtWidgets.QWidget):
 	def __set_badge_contents(self, reply):
 		""" Sets the user's information in the badge """
 		# Convert bytes to string and load the json data
-		user = json.loads(safe_decode(reply.readAll().data()))
+		user = self.manager.read_json(reply)
 
 		# Get user's name
 		try:
+			user_id = user["data"]["id"]
 			full_name = user["data"]["attributes"]["full_name"]
 			# Download avatar image from the specified url
 			avatar_url = user["data"]["links"]["profile_image"]
@@ -212,15 +298,108 @@ class UserBadge(QtWidgets.QWidget):
 		self.user_button.setText(full_name)
 		self.login_button.hide()
 		self.user_button.show()
+
+		# Show the avatar stored at a previous login right away, and only
+		# retrieve it again if it has changed since.
+		avatar_key = u'{}|{}'.format(user_id, avatar_url)
+		headers = {}
+		avatar_img = self.avatar_cache.get(avatar_key)
+		if not avatar_img is None and self.__show_user_photo(avatar_img):
+			validators = self.avatar_cache.get(avatar_key + u'|validators')
+			if not validators is None:
+				validators = json.loads(safe_decode(validators))
+				if validators.get('etag'):
+					headers['If-None-Match'] = validators['etag']
+				if validators.get('last_modified'):
+					headers['If-Modified-Since'] = validators['last_modified']
 		# Load the user image in the photo area
-		self.manager.get(avatar_url, self.__set_user_photo)
+		self.manager.get(avatar_url, self.__set_user_photo, avatar_key,
+			headers=headers)
 
-	def __set_user_photo(self, reply):
+	def __set_user_photo(self, reply, avatar_key=None):
 		""" Sets the photo of the user in the userbadge """
+		# The cached avatar that is already shown is still up to date
+		status = reply.attribute(QtNetwork.QNetworkRequest.HttpStatusCodeAttribute)
+		if status == 304:
+			return
 		avatar_img = reply.readAll().data()
+		if not self.__show_user_photo(avatar_img) or avatar_key is None:
+			return
+		self.avatar_cache.put(avatar_key, avatar_img)
+		validators = {
+			'etag': safe_decode(reply.rawHeader(b'ETag').data()),
+			'last_modified': safe_decode(reply.rawHeader(b'Last-Modified').data()),
+		}
+		self.avatar_cache.put(avatar_key + u'|validators',
+			safe_encode(json.dumps(validators)))
+
+	def __show_user_photo(self, avatar_img):
+		""" Shows the image data avatar_img as the photo of the user. Returns
+		False if the data could not be loaded as an image. """
 		pixmap = QtGui.QPixmap()
-		pixmap.loadFromData(avatar_img)
+		if not pixmap.loadFromData(avatar_img):
+			return False
 		self.user_button.setIcon(QtGui.QIcon(pixmap))
+		return True
+
+class PreviewDecoder(QtCore.QRunnable):
+	""" Decodes a downloaded image for a preview in a worker thread (see
+	QtCore.QThreadPool). Large images are scaled down by the image reader
+	while decoding, so the full resolution bitmap is never created. The
+	decoded QImage and its encoding for the thumbnail cache are passed to the
+	GUI thread through the finished signal, which is emitted with the key of
+	the preview, the passed token, the QImage and the encoded bytes (or None).
+	"""
+
+	def __init__(self, data, max_size, finished, key, token=None):
+		""" Constructor
+
+		Parameters
+		----------
+		data : QtCore.QByteArray
+			The contents of the image file
+		max_size : QtCore.QSize
+			The size the image should at most have
+		finished : QtCore.pyqtBoundSignal
+			The signal to emit with the results
+		key : str
+			The key of the preview
+		token : object (default: None)
+			Passed back along with the results, to recognize stale results.
+		"""
+		super(PreviewDecoder, self).__init__()
+		self.data = data
+		self.max_size = max_size
+		self.finished = finished
+		self.key = key
+		self.token = token
+
+	def run(self):
+		image = QtGui.QImage()
+		encoded = None
+		# Exceptions can't propagate out of a worker thread
+		try:
+			buf = QtCore.QBuffer(self.data)
+			buf.open(QtCore.QIODevice.ReadOnly)
+			reader = QtGui.QImageReader(buf)
+			size = reader.size()
+			if size.isValid() and (size.width() > self.max_size.width() or \
+				size.height() > self.max_size.height()):
+				reader.setScaledSize(size.scaled(self.max_size,
+					QtCore.Qt.KeepAspectRatio))
+			image = reader.read()
+			buf.close()
+			if not image.isNull():
+				out = QtCore.QBuffer()
+				out.open(QtCore.QIODevice.WriteOnly)
+				# Photos are much smaller as JPEG, but that loses transparency
+				image_format = 'PNG' if image.hasAlphaChannel() else 'JPG'
+				if image.save(out, image_format):
+					encoded = out.data().data()
+				out.close()
+		except Exception as e:
+			logging.error("Could not decode image preview: {}".format(e))
+		self.finished.emit(self.key, self.token, image, encoded)
 
 class OSFExplorer(QtWidgets.QWidget):
 	""" An explorer of the current user's OSF account """
@@ -232,24 +411,55 @@ class OSFExplorer(QtWidgets.QWidget):
 	datedisplay = '{} ({})'
 	# The maximum size an image may have to be downloaded for preview
 	preview_size_limit = 1024**2/2.0
+	# Image previews are kept at most this size, in memory and on disk
+	thumbnail_size = QtCore.QSize(512,512)
+	# The number of previews kept in memory
+	preview_cache_size = 64
+	# The number of bytes the thumbnails stored on disk may take up
+	thumbnail_cache_budget = 50*1024**2
+	# The number of bytes retrieved from the start of text files for their
+	# preview, and the number of rows shown of tabular files
+	text_preview_size = 16*1024
+	table_preview_rows = 50
+	# Files with these extensions are previewed as text, in addition to those
+	# with a text mimetype. csv and tsv files are shown as a table.
+	text_preview_extensions = ['.txt', '.log', '.dat', '.csv', '.tsv',
+		'.json', '.xml', '.md', '.py', '.r', '.m']
+	table_preview_delimiters = {'.csv': ',', '.tsv': '\t'}
+	# Previews of the siblings within this distance of the selected item, and
+	# of items under the mouse cursor, are retrieved in the background
+	prefetch_distance = 3
+	# The maximum number of previews retrieved in the background at once
+	prefetch_max_requests = 2
+	# The time in ms the selection has to stay put before prefetching starts
+	prefetch_delay = 250
+	# The maximum number of previews waiting to be prefetched
+	prefetch_queue_size = 32
 	# Signal that is sent if image preview should be aborted
 	abort_preview = QtCore.pyqtSignal()
+	# Signal that is sent by PreviewDecoder when an image has been decoded
+	preview_decoded = QtCore.pyqtSignal(object, object, object, object)
 
-	def __init__(self, manager, tree_widget=None, locale='en_us'):
+	def __init__(self, manager, tree_widget=None, locale='en_us',
+		thumbnail_dir=None):
 		""" Constructor
 
-		Can be passed a reference to an already existing ProjectTree if desired,
-		otherwise it creates a new instance of this object.
+		Can be passed a reference to an already existing ProjectTree or
+		ProjectTreeView if desired, otherwise it creates a new ProjectTree.
 
 		Parameters
 		----------
 		manager : manger.ConnectionManager
 			The object taking care of all the communication with the OSF
-		tree_widget : ProjectTree (default: None)
+		tree_widget : ProjectTree or ProjectTreeView (default: None)
 			The kind of object, which can be project, folder or file
 		locale : string (default: en-us)
 			The language in which the time information should be presented.\
 			Should consist of lowercase characters only (e.g. nl_nl)
+		thumbnail_dir : string (default: None)
+			The folder in which thumbnails of previewed images are stored. If
+			not specified, a folder in the cache folder of the user is used
+			(see cache_location()).
 		"""
 		# Call parent's constructor
 		super(OSFExplorer, self).__init__()
@@ -284,14 +494,14 @@ class OSFExplorer(QtWidgets.QWidget):
 		# ProjectTree widget. Can be passed as a reference to this object.
 		if tree_widget is None:
 			# Create a new ProjectTree instance
-			self.tree = ProjectTree()
+			self.tree = ProjectTree(manager)
 		else:
-			# Check if passed reference is a ProjectTree instance
-			if type(tree_widget) != ProjectTree:
-				raise TypeError("Passed tree_widget should be a 'ProjectTree'\
-					instance.")
+			# Check if passed reference is a ProjectTree(View) instance
+			if not isinstance(tree_widget, ProjectTreeMixin):
+				raise TypeError("Passed tree_widget should be a 'ProjectTree'"
+					" or 'ProjectTreeView' instance.")
 			else:
-				# assign passed reference of ProjectTree to this instance
+				# assign passed reference of the tree to this instance
 				self.tree = tree_widget
 
 		self.tree.setSortingEnabled(True)
@@ -312,12 +522,47 @@ class OSFExplorer(QtWidgets.QWidget):
 		# needs to be rescaled, it is done with this variable as the img source
 		self.current_img_preview = None
 
+		# Previously shown previews, by file id and modification date
+		if thumbnail_dir is None:
+			thumbnail_dir = cache_location('thumbnails')
+		self.preview_cache = LRUCache(self.preview_cache_size)
+		self.thumbnail_cache = DiskCache(thumbnail_dir,
+			self.thumbnail_cache_budget)
+		# Images are decoded in a worker thread. Previews are only shown if
+		# they belong to the currently selected file.
+		self.current_preview_key = None
+		self.preview_decoded.connect(self.__preview_decoded)
+
+		# Previews of files near the selected one that are to be retrieved in
+		# the background, and the keys of the ones in progress
+		self.prefetch_queue = deque(maxlen=self.prefetch_queue_size)
+		self.prefetching = set()
+		self.prefetch_timer = QtCore.QTimer(self)
+		self.prefetch_timer.setSingleShot(True)
+		self.prefetch_timer.setInterval(self.prefetch_delay)
+		self.prefetch_timer.timeout.connect(self.__process_prefetch_queue)
+
 		# The progress bar depicting the download state of the image preview
 		self.img_preview_progress_bar = QtWidgets.QProgressBar()
 		self.img_preview_progress_bar.setAlignment(QtCore.Qt.AlignCenter)
 		self.img_preview_progress_bar.hide()
 
+		# Spaces for the first part of text and tabular files
+		self.text_preview = QtWidgets.QPlainTextEdit()
+		self.text_preview.setReadOnly(True)
+		self.text_preview.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+		monospace = QtGui.QFont('Monospace')
+		monospace.setStyleHint(QtGui.QFont.TypeWriter)
+		self.text_preview.setFont(monospace)
+		self.text_preview.hide()
+		self.table_preview = QtWidgets.QTableWidget()
+		self.table_preview.setEditTriggers(
+			QtWidgets.QAbstractItemView.NoEditTriggers)
+		self.table_preview.hide()
+
 		preview_area.addWidget(self.image_space)
+		preview_area.addWidget(self.text_preview)
+		preview_area.addWidget(self.table_preview)
 		preview_area.addWidget(self.img_preview_progress_bar)
 
 		## Create layouts
@@ -337,9 +582,16 @@ class OSFExplorer(QtWidgets.QWidget):
 		self.info_frame.setLayout(info_grid)
 		self.info_frame.setVisible(False)
 
+		# Search field above the tree
+		tree_pane = QtWidgets.QWidget(self)
+		tree_layout = QtWidgets.QVBoxLayout(tree_pane)
+		tree_layout.setContentsMargins(0, 0, 0, 0)
+		tree_layout.addLayout(self.__create_search_bar())
+		tree_layout.addWidget(self.tree)
+
 		# Combine tree and info frame with a splitter in the middle
 		splitter = QtWidgets.QSplitter(QtCore.Qt.Horizontal)
-		splitter.addWidget(self.tree)
+		splitter.addWidget(tree_pane)
 		splitter.addWidget(self.info_frame)
 
 		# Create buttons at the bottom
@@ -375,6 +627,8 @@ class OSFExplorer(QtWidgets.QWidget):
 
 		# Event connections
 		self.tree.currentItemChanged.connect(self.__slot_currentItemChanged)
+		self.tree.setMouseTracking(True)
+		self.tree.itemEntered.connect(self.__slot_itemEntered)
 		self.tree.itemSelectionChanged.connect(self.__slot_itemSelectionChanged)
 		self.tree.refreshFinished.connect(self.__tree_refresh_finished)
 
@@ -389,6 +643,34 @@ class OSFExplorer(QtWidgets.QWidget):
 			pm = self.current_img_preview.scaledToHeight(new_height)
 			self.image_space.setPixmap(pm)
 
+	def __create_search_bar(self):
+		""" Creates the search field with which items can be found by name """
+		search_bar = QtWidgets.QHBoxLayout()
+
+		self.search_field = QtWidgets.QLineEdit(self)
+		self.search_field.setPlaceholderText(_(u"Search by name or path"))
+		self.search_field.setToolTip(_(u"Press enter to jump to the next match"))
+		if hasattr(self.search_field, 'setClearButtonEnabled'):
+			self.search_field.setClearButtonEnabled(True)
+		self.search_field.textChanged.connect(self.__search_text_changed)
+		self.search_field.returnPressed.connect(self.__show_next_search_result)
+
+		self.search_status = QtWidgets.QLabel(self)
+
+		# Only search once the user stops typing for a moment
+		self.search_timer = QtCore.QTimer(self)
+		self.search_timer.setSingleShot(True)
+		self.search_timer.setInterval(150)
+		self.search_timer.timeout.connect(self.__search)
+
+		# The items found by the last search and the one currently shown
+		self.search_results = []
+		self.search_position = 0
+
+		search_bar.addWidget(self.search_field)
+		search_bar.addWidget(self.search_status)
+		return search_bar
+
 	def __create_buttonbar(self):
 		""" Creates the button bar at the bottom of the explorer """
 		# General buttonbar widget
@@ -397,7 +679,7 @@ class OSFExplorer(QtWidgets.QWidget):
 		buttonbar.setLayout(buttonbar_hbox)
 
 		# Refresh button - always visible
-
+		import qtawesome as qta
 		self.refresh_icon = qta.icon('fa.refresh', color='green')
 		self.refresh_button = QtWidgets.QPushButton(self.refresh_icon, _('Refresh'))
 		self.refresh_icon_spinning = qta.icon(
@@ -409,10 +691,7 @@ class OSFExplorer(QtWidgets.QWidget):
 
 		# Other buttons, depend on config settings of OSF explorer
 
-		self.new_folder_icon = QtGui.QIcon.fromTheme(
-			'folder-new',
-			qta.icon('ei.folder-sign')
-		)
+		self.new_folder_icon = theme_icon('folder-new', 'ei.folder-sign')
 		self.new_folder_button = QtWidgets.QPushButton(self.new_folder_icon, _('New folder'))
 		self.new_folder_button.setIconSize(self.button_icon_size)
 		self.new_folder_button.clicked.connect(self.__clicked_new_folder)
@@ -420,10 +699,7 @@ class OSFExplorer(QtWidgets.QWidget):
 			" selected location"))
 		self.new_folder_button.setDisabled(True)
 
-		self.delete_icon = QtGui.QIcon.fromTheme(
-			'user-trash-symbolic',
-			qta.icon('fa.trash')
-		)
+		self.delete_icon = theme_icon('user-trash-symbolic', 'fa.trash')
 		self.delete_button = QtWidgets.QPushButton(self.delete_icon, _('Delete'))
 		self.delete_button.setIconSize(self.button_icon_size)
 		self.delete_button.clicked.connect(self.__clicked_delete)
@@ -431,10 +707,7 @@ class OSFExplorer(QtWidgets.QWidget):
 			"folder"))
 		self.delete_button.setDisabled(True)
 
-		self.download_icon = QtGui.QIcon.fromTheme(
-			'go-down',
-			qta.icon('fa.cloud-download')
-		)
+		self.download_icon = theme_icon('go-down', 'fa.cloud-download')
 		self.download_button = QtWidgets.QPushButton(self.download_icon,
 			_('Download'))
 		self.download_button.setIconSize(self.button_icon_size)
@@ -442,10 +715,7 @@ class OSFExplorer(QtWidgets.QWidget):
 		self.download_button.setToolTip(_(u"Download the currently selected file"))
 		self.download_button.setDisabled(True)
 
-		self.upload_icon = QtGui.QIcon.fromTheme(
-			'go-up',
-			qta.icon('fa.cloud-upload')
-		)
+		self.upload_icon = theme_icon('go-up', 'fa.cloud-upload')
 		self.upload_button = QtWidgets.QPushButton(self.upload_icon,
 			_('Upload'))
 		self.upload_button.clicked.connect(self.__clicked_upload_file)
@@ -519,19 +789,15 @@ class OSFExplorer(QtWidgets.QWidget):
 
 		data = item.data(0,QtCore.Qt.UserRole)
 		# Don't make context menu for a project
-		if data['type'] == 'nodes':
+		if data.is_node:
 			return None
 
-		if data['type'] == 'files':
-			kind = data["attributes"]["kind"]
+		kind = data.kind
 
 		# Check if the current item is a repository (which is represented as a
 		# normal folder)
 		parent_data = item.parent().data(0, QtCore.Qt.UserRole)
-		if parent_data['type'] == 'nodes':
-			item_is_repo = True
-		else:
-			item_is_repo = False
+		item_is_repo = parent_data.is_node
 
 		menu = QtWidgets.QMenu(self.tree)
 
@@ -613,51 +879,43 @@ class OSFExplorer(QtWidgets.QWidget):
 
 		Parameters
 		----------
-		attributes : dict
-			A dictionary containing the information retrieved from the OSF,
-			stored at the data/attributes path of the json response
+		data : ItemRecord or dict
+			The record of the file, or the JSON representation of the file as
+			retrieved from the OSF
 		"""
 		# Get required properties
-		attributes = data['attributes']
+		data = ItemRecord.wrap(data)
 
-		name = attributes.get("name", "Unspecified")
-		filesize = attributes.get("size", "Unspecified")
-		created = attributes.get("date_created", "Unspecified")
-		modified = attributes.get("date_modified", "Unspecified")
+		name = data.name or "Unspecified"
+		filesize = data.size
+		created = data.date_created or "Unspecified"
+		modified = data.date_modified or "Unspecified"
 
 		if check_if_opensesame_file(name):
 			filetype = "OpenSesame experiment"
 		else:
 			# Use fileinspector to determine filetype
-			filetype = fileinspector.determine_type(name)
+			filetype = filetypes.determine_type(name)
 			# If filetype could not be determined, the response is False
 			if not filetype is None:
 				self.properties["Type"][1].setText(filetype)
 
-				if fileinspector.determine_category(filetype) == "image":
-					# Download and display image if it is not too big.
-					if not filesize is None and  filesize <= self.preview_size_limit:
-						self.img_preview_progress_bar.setValue(0)
-						self.img_preview_progress_bar.show()
-						self.manager.get(
-							data["links"]["download"],
-							self.__set_image_preview,
-							downloadProgress = self.__prev_dl_progress,
-							errorCallback=self.__img_preview_error,
-							abortSignal = self.abort_preview
-						)
-
 			else:
 				filetype = "file"
 
+		# Show a preview of images and of the first part of text files
+		self.__load_preview(data)
+
 		# If filesize is None, default to the value 'Unspecified'
 		if filesize is None:
 			filesize = "Unspecified"
 		# If filesize is a number do some reformatting of the data to make it
 		# look nicer for us humans
 		if filesize != "Unspecified" and isinstance(filesize, int):
+			import humanize
 			filesize = humanize.naturalsize(filesize)
 
+		import arrow
 		# Format created time
 		if created != "Unspecified":
 			cArrow = arrow.get(created).to('local')
@@ -693,21 +951,14 @@ class OSFExplorer(QtWidgets.QWidget):
 
 		Parameters
 		----------
-		attributes : dict
-			A dictionary containing the information retrieved from the OSF,
-			stored at the data/attributes path of the json response
+		data : ItemRecord or dict
+			The record of the folder or project, or its JSON representation as
+			retrieved from the OSF
 		"""
-		attributes = data['attributes']
-		# A node (i.e. a project) has title and category fields
-		if "title" in attributes and "category" in attributes:
-			self.properties["Name"][1].setText(attributes["title"])
-			self.properties["Type"][1].setText(attributes["category"])
-		elif "name" in attributes and "kind" in attributes:
-			self.properties["Name"][1].setText(attributes["name"])
-			self.properties["Type"][1].setText(attributes["kind"])
-		else:
-			raise osf.OSFInvalidResponse("Invalid structure for folder property"
-				" received")
+		# For a node (i.e. a project) these are its title and category
+		data = ItemRecord.wrap(data)
+		self.properties["Name"][1].setText(data.name)
+		self.properties["Type"][1].setText(data.kind)
 
 		# Make sure the fields specific for files are shown
 		for row in self.file_fields:
@@ -772,18 +1023,18 @@ class OSFExplorer(QtWidgets.QWidget):
 
 		# Reset the image preview contents
 		self.current_img_preview = None
+		self.current_preview_key = None
 		self.img_preview_progress_bar.hide()
+		self.__hide_text_preview()
 
 		# Abort previous preview operation (if any)
 		self.abort_preview.emit()
+		# Retrieve the previews of the neighbouring files in the background
+		self.__prefetch(self.__neighbours(item))
 
 		data = item.data(0, QtCore.Qt.UserRole)
-		if data['type'] == 'nodes':
-			name = data["attributes"]["title"]
-			kind = data["attributes"]["category"]
-		if data['type'] == 'files':
-			name = data["attributes"]["name"]
-			kind = data["attributes"]["kind"]
+		name = data.name
+		kind = data.kind
 
 		pm = self.tree.get_icon(kind, name).pixmap(self.preview_size)
 		self.image_space.setPixmap(pm)
@@ -803,7 +1054,7 @@ class OSFExplorer(QtWidgets.QWidget):
 			# If so the current 'folder' must be a storage provider (e.g. dropbox)
 			# which should not be allowed to be deleted.
 			parent_data = item.parent().data(0, QtCore.Qt.UserRole)
-			if parent_data['type'] == 'nodes':
+			if parent_data.is_node:
 				self.delete_button.setDisabled(True)
 			else:
 				self.delete_button.setDisabled(False)
@@ -814,6 +1065,62 @@ class OSFExplorer(QtWidgets.QWidget):
 			self.upload_button.setDisabled(True)
 			self.delete_button.setDisabled(True)
 
+	def __slot_itemEntered(self, item, col):
+		""" Handles the QTreeWidget itemEntered event. Files under the mouse
+		cursor are likely to be selected next, so their previews are retrieved
+		before those of the neighbours of the current item. """
+		self.__prefetch([item], urgent=True)
+
+	def __search_text_changed(self, text):
+		""" Starts (or restarts) the timer after which the search is
+		performed """
+		self.search_timer.start()
+
+	def __search(self):
+		""" Searches the tree for the text in the search field and shows the
+		best match """
+		query = safe_decode(self.search_field.text()).strip()
+		self.search_position = 0
+		if not query:
+			self.search_results = []
+			self.search_status.setText('')
+			return
+		self.search_results = self.tree.search(query)
+		self.__show_search_result()
+
+	def __reset_search(self):
+		""" Forgets the results of the last search. Called when the tree is
+		cleared, as the items in the results are deleted along with it. """
+		self.search_timer.stop()
+		self.search_results = []
+		self.search_position = 0
+		self.search_status.setText('')
+
+	def __show_next_search_result(self):
+		""" Jumps to the next item in the search results """
+		# If the search is still pending, perform it right away
+		if self.search_timer.isActive():
+			self.search_timer.stop()
+			self.__search()
+			return
+		if not self.search_results:
+			return
+		self.search_position = (self.search_position + 1) % \
+			len(self.search_results)
+		self.__show_search_result()
+
+	def __show_search_result(self):
+		""" Selects the current search result and reveals it in the tree """
+		if not self.search_results:
+			self.search_status.setText(_(u"No matches"))
+			return
+		self.search_status.setText(u"{}/{}".format(self.search_position + 1,
+			len(self.search_results)))
+		item = self.search_results[self.search_position]
+		# scrollToItem() also expands the parents of the item
+		self.tree.scrollToItem(item)
+		self.tree.setCurrentItem(item)
+
 	def __slot_itemSelectionChanged(self):
 		items_selected = bool(self.tree.selectedItems())
 		# If there are selected items, show the properties pane
@@ -844,6 +1151,8 @@ class OSFExplorer(QtWidgets.QWidget):
 
 		self.refresh_button.setDisabled(True)
 		self.refresh_button.setIcon(self.refresh_icon_spinning)
+		# The search is repeated once the refresh is finished
+		self.__reset_search()
 		self.tree.refresh_contents()
 
 	def _clicked_download_file(self):
@@ -851,8 +1160,8 @@ class OSFExplorer(QtWidgets.QWidget):
 		selected file to the user specified location. """
 		selected_item = self.tree.currentItem()
 		data = selected_item.data(0, QtCore.Qt.UserRole)
-		download_url = data['links']['download']
-		filename = data['attributes']['name']
+		download_url = data.download_url
+		filename = data.name
 
 		# See if a previous folder was set, and if not, try to set
 		# the user's home folder as a starting folder
@@ -875,10 +1184,10 @@ class OSFExplorer(QtWidgets.QWidget):
 			# Remember this folder for later when this dialog has to be presented again
 			self.last_dl_destination_folder = os.path.split(destination)[0]
 			# Configure progress dialog (only if filesize is known)
-			if data['attributes']['size']:
+			if data.size:
 				progress_dialog_data={
 					"filename": filename,
-					"filesize": data['attributes']['size']
+					"filesize": data.size
 				}
 			else:
 				progress_dialog_data = None
@@ -899,12 +1208,12 @@ class OSFExplorer(QtWidgets.QWidget):
 		reply = QtWidgets.QMessageBox.question(
 			self,
 			_("Please confirm"),
-			_("Are you sure you want to delete '") + data['attributes']['name'] + "'?",
+			_("Are you sure you want to delete '") + data.name + "'?",
 			QtWidgets.QMessageBox.No | QtWidgets.QMessageBox.Yes
 		)
 
 		if reply == QtWidgets.QMessageBox.Yes:
-			delete_url = data['links']['delete']
+			delete_url = data.delete_url
 			self.manager.delete(delete_url, self.__item_deleted, selected_item)
 
 	def __clicked_upload_file(self):
@@ -912,7 +1221,7 @@ class OSFExplorer(QtWidgets.QWidget):
 		to the currently selected folder. """
 		selected_item = self.tree.currentItem()
 		data = selected_item.data(0, QtCore.Qt.UserRole)
-		upload_url = data['links']['upload']
+		upload_url = data.upload_url
 
 		# See if a previous folder was set, and if not, try to set
 		# the user's home folder as a starting folder
@@ -936,22 +1245,20 @@ class OSFExplorer(QtWidgets.QWidget):
 			self.last_open_destination_folder = folder
 			# ... and the convert to QFile
 			file_to_upload = QtCore.QFile(file_to_upload)
-			# Check if file is already present and get its index if so
-			index_if_present = self.tree.find_item(selected_item, 0, filename)
+			# Check if file is already present and get its item if so
+			old_item = self.tree.find_child(selected_item, filename, 'file')
 
-			# If index_is_present is None, the file is probably new
-			if index_if_present is None:
+			# If old_item is None, the file is probably new
+			if old_item is None:
 				# add required query parameters
 				upload_url += '?kind=file&name={}'.format(filename)
-			# If index_is_present is a number, it means the file is present
-			# and that file needs to be updated.
+			# Otherwise the file is present and needs to be updated.
 			else:
 				logging.info("File {} exists and will be updated".format(filename))
-				old_item = selected_item.child(index_if_present)
 				# Get data stored in item
 				old_item_data = old_item.data(0,QtCore.Qt.UserRole)
 				# Get file specific update utrl
-				upload_url = old_item_data['links']['upload']
+				upload_url = old_item_data.upload_url
 				upload_url += '?kind=file'
 			progress_dialog_data={
 				"filename": file_to_upload.fileName(),
@@ -963,8 +1270,7 @@ class OSFExplorer(QtWidgets.QWidget):
 				file_to_upload,
 				progressDialog=progress_dialog_data,
 				finishedCallback=self._upload_finished,
-				selectedTreeItem=selected_item,
-				updateIndex=index_if_present
+				selectedTreeItem=selected_item
 			)
 
 	def __clicked_new_folder(self):
@@ -972,7 +1278,7 @@ class OSFExplorer(QtWidgets.QWidget):
 		selected_item = self.tree.currentItem()
 		data = selected_item.data(0, QtCore.Qt.UserRole)
 		# Get new folder link from data
-		new_folder_url = data['links']['new_folder']
+		new_folder_url = data.new_folder_url
 
 		new_folder_name, ok = QtWidgets.QInputDialog.getText(self,
 			_(u'Create new folder'),
@@ -1000,7 +1306,7 @@ class OSFExplorer(QtWidgets.QWidget):
 		# See if upload action was triggered by interaction on a tree item
 		selectedTreeItem = kwargs.get('selectedTreeItem')
 		# The new item data should be returned in the reply
-		new_item_data = json.loads(safe_decode(reply.readAll().data()))
+		new_item_data = self.manager.read_json(reply)
 
 		# new_item_data is only reliable for osfstorage for now, so simply
 		# refresh the whole tree if data is from another provider.
@@ -1036,7 +1342,7 @@ class OSFExplorer(QtWidgets.QWidget):
 				# (thus without refreshing the whole tree). At the moment, this
 				# only works well for osfstorage...
 				node_data = selectedTreeItem.data(0,QtCore.Qt.UserRole)
-				node_id = node_data['id']
+				node_id = node_data.id
 				# Protocol for direct repository entries is a bit different than for
 				# subfolders
 				if ':' in node_id:
@@ -1076,12 +1382,14 @@ class OSFExplorer(QtWidgets.QWidget):
 		""" Called by __upload_finished, if it is possible to add the new item
 		at the correct position in the tree, without refreshing the whole tree.
 		"""
-		item = json.loads(safe_decode(reply.readAll().data()))
-		# Remove old item first, before adding new one
-		updateIndex = kwargs.get('updateIndex')
-		if not updateIndex is None:
-			parent_item.takeChild(updateIndex)
-		new_item, kind = self.tree.add_item(parent_item, item['data'])
+		item = self.manager.read_json(reply)
+		new_record = ItemRecord.from_json(item['data'])
+		# Remove the old item first if the upload replaced an existing file
+		old_item = self.tree.find_child(parent_item, new_record.name,
+			new_record.kind)
+		if not old_item is None:
+			self.tree.remove_item(old_item)
+		new_item, kind = self.tree.add_item(parent_item, new_record)
 		kwargs['new_item'] = new_item
 		# Perform the afterUploadCallback if it has been specified
 		after_upload_cb = kwargs.pop('afterUploadCallback', None)
@@ -1091,21 +1399,30 @@ class OSFExplorer(QtWidgets.QWidget):
 	def __item_deleted(self, reply, item):
 		""" Callback for when an item has been successfully deleted from the OSF.
 		Removes the item from the tree. """
-		item.parent().removeChild(item)
+		self.tree.remove_item(item)
 
 	def __tree_refresh_finished(self):
 		""" Slot for the event fired when the tree refresh is finished """
 		self.refresh_button.setIcon(self.refresh_icon)
 		self.refresh_button.setDisabled(False)
+		# Items that were removed by the refresh can no longer be shown, and
+		# items matching the search may have been added in the mean time.
+		if self.search_field.text():
+			self.__search()
 
 	def handle_login(self):
 		""" Callback function for EventDispatcher when a login event is detected """
 		self.login_required_overlay.setVisible(False)
 		self.refresh_button.setDisabled(True)
+		self.__reset_search()
 
 	def handle_logout(self):
 		""" Callback function for EventDispatcher when a logout event is detected """
 		self.image_space.setPixmap(QtGui.QPixmap())
+		self.__hide_text_preview()
+		self.prefetch_timer.stop()
+		self.prefetch_queue.clear()
+		self.__reset_search()
 		for label,value in self.properties.values():
 			value.setText("")
 		self.refresh_button.setDisabled(True)
@@ -1115,23 +1432,227 @@ class OSFExplorer(QtWidgets.QWidget):
 		""" Reimplementation of closeEvent. Makes sure the login window also
 		closes if the explorer closes. """
 		super(OSFExplorer, self).closeEvent(event)
-		self.manager.browser.close()
+		if not self.manager.browser is None:
+			self.manager.browser.close()
 
 	#--- Other callback functions
 
-	def __set_image_preview(self, img_content):
-		""" Callback for set_file_properties(). Sets the preview of an image in
-		the properties panel. """
-		# Create a pixmap from the just received data
-		self.current_img_preview = QtGui.QPixmap()
-		self.current_img_preview.loadFromData(img_content.readAll())
+	def __preview_key(self, data):
+		""" Returns the key under which the preview of a file is cached. The
+		modification date is part of it, so changed files are retrieved anew. """
+		return u'{}/{}'.format(data.id, data.date_modified)
+
+	def __preview_kind(self, data):
+		""" Returns the kind of preview that can be shown for a file: 'image',
+		'text' or None """
+		name = data.name
+		if check_if_opensesame_file(name):
+			return None
+		mimetype = filetypes.determine_type(name)
+		if not mimetype is None and \
+			filetypes.determine_category(mimetype) == 'image':
+			# Only download images if they are not too big.
+			if data.size is None or data.size > self.preview_size_limit:
+				return None
+			return 'image'
+		if self.__has_text_preview(name):
+			return 'text'
+		return None
+
+	def __cached_preview(self, key, kind='image'):
+		""" Returns the cached preview for key, from memory or else from disk,
+		or None if it is not cached. Image previews are returned as QPixmap,
+		text previews as str. """
+		preview = self.preview_cache.get(key)
+		if not preview is None:
+			return preview
+		cached = self.thumbnail_cache.get(key)
+		if cached is None:
+			return None
+		if kind == 'text':
+			preview = safe_decode(cached, errors='replace')
+		else:
+			preview = QtGui.QPixmap()
+			if not preview.loadFromData(cached):
+				return None
+		self.preview_cache.put(key, preview)
+		return preview
+
+	def __load_preview(self, data):
+		""" Shows the preview of a file, from the cache if it was retrieved
+		before, or otherwise retrieves it. """
+		preview_key = self.__preview_key(data)
+		self.current_preview_key = preview_key
+		kind = self.__preview_kind(data)
+		if kind is None:
+			return
+		preview = self.__cached_preview(preview_key, kind)
+		if kind == 'text' and isinstance(preview, basestring):
+			self.__show_text_preview(data.name, preview)
+		elif kind == 'image' and isinstance(preview, QtGui.QPixmap):
+			self.__show_image_preview(preview)
+		# If the preview is being prefetched already, it is shown as soon as
+		# it arrives
+		elif not preview_key in self.prefetching and data.download_url:
+			self.__request_preview(data, preview_key, kind)
+
+	def __request_preview(self, data, preview_key, kind, background=False):
+		""" Retrieves the data for the preview of a file. Of text files, only
+		the first text_preview_size bytes are requested. Background requests
+		are made with a low priority, don't report their progress or errors,
+		and (unlike the others) are not cancelled by abort_preview. """
+		kwargs = {}
+		if kind == 'text':
+			kwargs['headers'] = {
+				'Range': 'bytes=0-{}'.format(self.text_preview_size-1)}
+		if background:
+			self.prefetching.add(preview_key)
+			kwargs['priority'] = QtNetwork.QNetworkRequest.LowPriority
+			# The user didn't ask for this file, so don't bother them with
+			# errors
+			kwargs['quiet'] = True
+			if kind == 'text':
+				kwargs['downloadProgress'] = self.__limit_text_preview
+		else:
+			self.img_preview_progress_bar.setValue(0)
+			self.img_preview_progress_bar.show()
+			kwargs['abortSignal'] = self.abort_preview
+			kwargs['downloadProgress'] = self.__text_preview_progress \
+				if kind == 'text' else self.__prev_dl_progress
+		self.manager.get(
+			data.download_url,
+			self.__preview_received,
+			data,
+			preview_key,
+			kind,
+			errorCallback=lambda reply: self.__preview_error(reply, data,
+				preview_key),
+			**kwargs
+		)
+
+	def __preview_received(self, reply, data, preview_key, kind):
+		""" Callback for __request_preview() """
+		self.prefetching.discard(preview_key)
+		if kind == 'text':
+			self.__set_text_preview(reply.read(self.text_preview_size), data,
+				preview_key)
+		else:
+			# Large images are reduced to thumbnail size while decoding, in a
+			# worker thread. The preview is set by __preview_decoded().
+			decoder = PreviewDecoder(reply.readAll(), self.thumbnail_size,
+				self.preview_decoded, preview_key)
+			QtCore.QThreadPool.globalInstance().start(decoder)
+		self.__process_prefetch_queue()
+
+	def __preview_error(self, reply, data, preview_key):
+		""" Error callback for __request_preview(). Shows the start of a text
+		file if its download was stopped by __limit_text_preview(). """
+		self.prefetching.discard(preview_key)
+		content = reply.property('text_preview')
+		if not content is None:
+			self.__set_text_preview(bytes(content), data, preview_key)
+		elif preview_key == self.current_preview_key:
+			self.img_preview_progress_bar.hide()
+		self.__process_prefetch_queue()
+
+	def __neighbours(self, item):
+		""" Returns the visible files within prefetch_distance of item in its
+		parent, nearest first and alternating between below and above it """
+		parent = item.parent()
+		if parent is None:
+			return []
+		row = parent.indexOfChild(item)
+		neighbours = []
+		for distance in range(1, self.prefetch_distance+1):
+			for r in (row+distance, row-distance):
+				if r < 0 or r >= parent.childCount():
+					continue
+				sibling = parent.child(r)
+				if not sibling.isHidden() and \
+					sibling.data(0, QtCore.Qt.UserRole).kind == 'file':
+					neighbours.append(sibling)
+		return neighbours
+
+	def __prefetch(self, items, urgent=False):
+		""" Queues the previews of the files among items to be retrieved in
+		the background. The queue is processed once the selection has been
+		stable for prefetch_delay ms.
+
+		Parameters
+		----------
+		items : list
+			The QTreeWidgetItems of which to retrieve the previews
+		urgent : bool (default: False)
+			If True, the items are put at the front of the queue. Otherwise
+			they replace the items that are still waiting. The queue holds
+			at most prefetch_queue_size previews, and each of them only once.
+		"""
+		# Store the records rather than the items, as these may be deleted
+		# when the tree is refreshed in the mean time.
+		records = [item.data(0, QtCore.Qt.UserRole) for item in items]
+		records = [data for data in records if not data is None and \
+			data.kind == 'file']
+		if urgent:
+			records += list(self.prefetch_queue)
+		queue = deque(maxlen=self.prefetch_queue_size)
+		keys = set()
+		for data in records:
+			preview_key = self.__preview_key(data)
+			if preview_key in keys:
+				continue
+			keys.add(preview_key)
+			queue.append(data)
+			if len(queue) == queue.maxlen:
+				break
+		self.prefetch_queue = queue
+		self.prefetch_timer.start()
+
+	def __process_prefetch_queue(self):
+		""" Starts retrieving the queued previews in the background, as far as
+		the budget of prefetch_max_requests allows. Previews that are cached
+		already, or that are being retrieved, are skipped. """
+		if self.prefetch_timer.isActive():
+			return
+		while self.prefetch_queue and \
+			len(self.prefetching) < self.prefetch_max_requests:
+			data = self.prefetch_queue.popleft()
+			if not data.download_url:
+				continue
+			preview_key = self.__preview_key(data)
+			if preview_key in self.prefetching or \
+				preview_key == self.current_preview_key or \
+				preview_key in self.preview_cache or \
+				preview_key in self.thumbnail_cache:
+				continue
+			kind = self.__preview_kind(data)
+			if not kind is None:
+				self.__request_preview(data, preview_key, kind, background=True)
+
+	def __show_image_preview(self, pixmap):
+		""" Shows pixmap as the preview in the properties panel """
+		self.current_img_preview = pixmap
 		# Scale to preview area hight
 		pixmap = self.current_img_preview.scaledToHeight(self.image_space.height())
 		# Hide progress bar
 		self.img_preview_progress_bar.hide()
 		# Show image preview
 		self.image_space.setPixmap(pixmap)
-		# Reset variable holding preview reply object
+
+	def __preview_decoded(self, preview_key, token, image, encoded):
+		""" Receives the results of PreviewDecoder. Caches the decoded image,
+		and shows it if it belongs to the current selection. """
+		current = preview_key == self.current_preview_key
+		if image.isNull():
+			if current:
+				self.img_preview_progress_bar.hide()
+			return
+		# Pixmaps can only be created in the GUI thread
+		pixmap = QtGui.QPixmap.fromImage(image)
+		self.preview_cache.put(preview_key, pixmap)
+		if not encoded is None:
+			self.thumbnail_cache.put(preview_key, encoded)
+		if current:
+			self.__show_image_preview(pixmap)
 
 	def __prev_dl_progress(self, received, total):
 		""" Callback for set_file_properties() """
@@ -1144,22 +1665,109 @@ class OSFExplorer(QtWidgets.QWidget):
 		progress = 100*received/total
 		self.img_preview_progress_bar.setValue(progress)
 
-	def __img_preview_error(self, reply):
-		""" Callback for set_file_properties() """
-		self.img_preview_progress_bar.hide()
-
-class ProjectTree(QtWidgets.QTreeWidget):
-	""" A tree representation of projects and files on the OSF for the current user
-	in a treeview widget"""
+	def __has_text_preview(self, name):
+		""" Checks if the file called name can be previewed as text """
+		if filetypes.type_key(name) in self.text_preview_extensions:
+			return True
+		mimetype = filetypes.determine_type(name)
+		return not mimetype is None and \
+			filetypes.determine_category(mimetype) in ['text', 'code']
+
+	def __text_preview_progress(self, received, total):
+		""" Progress callback for the retrieval of text previews """
+		if received <= self.text_preview_size:
+			self.__prev_dl_progress(received, max(total, self.text_preview_size))
+		else:
+			self.__limit_text_preview(received, total)
 
-	# Event fired when refresh of tree is finished
-	refreshFinished = QtCore.pyqtSignal()
+	def __limit_text_preview(self, received, total):
+		""" Servers that don't support Range requests send the whole file, so
+		stop the download as soon as enough of it has been received. The data
+		is picked up by __preview_error(). """
+		if received <= self.text_preview_size:
+			return
+		reply = self.sender()
+		if reply.property('text_preview') is None:
+			reply.setProperty('text_preview',
+				reply.read(self.text_preview_size))
+			reply.abort()
+
+	def __set_text_preview(self, content, data, preview_key):
+		""" Decodes the start of a text file, caches it and shows it """
+		text = safe_decode(content, errors='replace')
+		# Drop the last line if it is cut off
+		if data.size is None or data.size > len(content):
+			text = text.rsplit('\n', 1)[0]
+		self.preview_cache.put(preview_key, text)
+		self.thumbnail_cache.put(preview_key, safe_encode(text))
+		if preview_key == self.current_preview_key:
+			self.__show_text_preview(data.name, text)
+
+	def __show_text_preview(self, name, text):
+		""" Shows text in the preview area, as a table if the file is
+		tabular data """
+		self.img_preview_progress_bar.hide()
+		self.image_space.hide()
+		delimiter = self.table_preview_delimiters.get(filetypes.type_key(name))
+		if delimiter is None:
+			self.text_preview.setPlainText(text)
+			self.text_preview.show()
+			return
 
-	def __init__(self, manager, use_theme=None, theme_path='./resources/iconthemes'):
-		""" Constructor
-		Creates a tree showing the contents of the user's OSF repositories.
-		Can be passed a theme to use for the icons, but if this doesn't happen
-		it will use the default qtawesome (FontAwesome) icons.
+		rows = []
+		for row in csv.reader(text.splitlines(), delimiter=safe_str(delimiter)):
+			rows.append(row)
+			if len(rows) > self.table_preview_rows:
+				break
+		header = rows.pop(0) if rows else []
+		table = self.table_preview
+		table.clear()
+		table.setColumnCount(max([len(header)] + [len(row) for row in rows]))
+		table.setRowCount(len(rows))
+		table.setHorizontalHeaderLabels(header)
+		for row_nr, row in enumerate(rows):
+			for col_nr, value in enumerate(row):
+				table.setItem(row_nr, col_nr, QtWidgets.QTableWidgetItem(value))
+		table.show()
+
+	def __hide_text_preview(self):
+		""" Hides the text preview (if any) and shows the image space again """
+		self.text_preview.hide()
+		self.text_preview.clear()
+		self.table_preview.hide()
+		self.table_preview.clear()
+		self.image_space.show()
+
+class ProjectTreeMixin(object):
+	""" The functionality that ProjectTree and ProjectTreeView share: indexes of
+	the items by OSF id, name and extension, filtering, searching, refreshing
+	and the icons of the items. It is combined with a Qt tree widget or view,
+	which provides the items. For ProjectTree these are QTreeWidgetItems, and
+	for ProjectTreeView TreeViewItems, which offer the same interface. Both
+	trees therefore have the same public API.
+
+	Internally, the indexes hold entries, which are the items themselves for
+	ProjectTree and the nodes of the model for ProjectTreeView. The subclasses
+	implement _entry_record(), _set_entry_hidden() and _item_for_entry() to
+	handle them, and _populate() to retrieve the contents of the tree. """
+
+	# The theme icons of the storage providers
+	providers = {
+		'osfstorage'   : osf_logo_path,
+		'github'       : 'web-github',
+		'dropbox'      : 'dropbox',
+		'googledrive'  : 'web-google-drive',
+		'box'          : 'web-microsoft-onedrive',
+		'cloudfiles'   : 'web-microsoft-onedrive',
+		'dataverse'    : 'web-microsoft-onedrive',
+		'figshare'     : 'web-microsoft-onedrive',
+		's3'           : 'web-microsoft-onedrive',
+	}
+
+	def _init_tree(self, manager, use_theme=None,
+		theme_path='./resources/iconthemes'):
+		""" Sets up the state shared by both trees. Called by the constructors
+		of the subclasses, after the Qt class has been initialized.
 
 		Parameters
 		----------
@@ -1171,8 +1779,6 @@ class ProjectTree(QtWidgets.QTreeWidget):
 			Relevant only on Windows and OSX as the location of icon themes on
 			Linux is standardized.
 		"""
-		super(ProjectTree, self).__init__()
-
 		self.manager = manager
 
 		# Check for argument specifying that qt_theme should be used to
@@ -1196,29 +1802,31 @@ class ProjectTree(QtWidgets.QTreeWidget):
 		osf_icon = QtGui.QIcon(osf_logo_path)
 		self.setWindowIcon(osf_icon)
 
-		# Set column labels
-		self.setHeaderLabels(["Name","Kind","Size"])
-		self.setColumnWidth(0,300)
-
-		# Event handling
-		self.itemExpanded.connect(self.__set_expanded_icon)
-		self.itemCollapsed.connect(self.__set_collapsed_icon)
-		self.refreshFinished.connect(self.__refresh_finished)
-
-		# Items currently expanded
-		self.expanded_items = set()
-
 		# Set icon size for tree items
 		self.setIconSize(QtCore.QSize(20,20))
 
-		# Due to the recursive nature of the tree populating function, it is
-		# sometimes difficult to keep track of if the populating function is still
-		# active. This is a somewhat hacky attempt to artificially keep try to keep
-		# track, by adding current requests in this list.
-		self.active_requests = []
+		# Ids of the items currently expanded
+		self.expanded_items = set()
 
 		# Init filter variable
 		self._filter = None
+		# The filter compiled to a regular expression, and the extensions it
+		# selects on (if the filter consists of extensions only)
+		self._filter_regex = None
+		self._filter_extensions = None
+
+		# The file entries in the tree, grouped by extension and stored by their
+		# OSF id. This allows the filter to show or hide whole groups of files
+		# at once, instead of matching each file separately.
+		self.extension_index = {}
+		# The visibility of each extension group under the filter that is
+		# currently applied: True (all shown), False (all hidden) or None
+		# (decided per file)
+		self.extension_visibility = {}
+		# All entries in the tree by their OSF id, and an index to search them
+		# by name or path
+		self.item_index = {}
+		self.search_index = SearchIndex()
 
 		# Save the previously selected item before a refresh, so this item can
 		# be set as the selected item again after the refresh
@@ -1227,52 +1835,92 @@ class ProjectTree(QtWidgets.QTreeWidget):
 		# Flag that indicates if contents are currently refreshed
 		self.isRefreshing = False
 
-	### Private functions
+	### Functions to be implemented by the subclasses
 
-	def __set_expanded_icon(self,item):
-		data = item.data(0, QtCore.Qt.UserRole)
-		if data['type'] == 'files' and data['attributes']['kind'] == 'folder':
-			item.setIcon(0,self.get_icon('folder-open',data['attributes']['name']))
-		self.expanded_items.add(data['id'])
+	def _entry_record(self, entry):
+		""" Returns the ItemRecord of an entry in the indexes """
+		raise NotImplementedError
 
-	def __set_collapsed_icon(self,item):
-		data = item.data(0, QtCore.Qt.UserRole)
-		if data['type'] == 'files' and data['attributes']['kind'] == 'folder':
-			item.setIcon(0,self.get_icon('folder',data['attributes']['name']))
-		self.expanded_items.discard(data['id'])
+	def _set_entry_hidden(self, entry, hidden):
+		""" Hides or shows the item of an entry in the indexes """
+		raise NotImplementedError
 
-	def __populate_error(self, reply):
-		""" Callback for when an error occured while populating the tree. """
-		# Reset active requests after error
-		try:
-			self.active_requests.remove(reply)
-		except ValueError:
-			logging.info("Reply not found in active requests")
+	def _item_for_entry(self, entry):
+		""" Returns the item of an entry in the indexes """
+		raise NotImplementedError
 
-		if not self.active_requests:
-			self.refreshFinished.emit()
+	def _populate(self, url):
+		""" Clears the tree and starts retrieving its contents, starting with
+		the listing of projects at url """
+		raise NotImplementedError
 
-	def __refresh_finished(self):
-		""" Expands all treewidget items again that were expanded before the
-		refresh. """
+	### Private functions
 
-		# Reapply filter if set
-		if self._filter:
-			self.filter = self._filter
+	def __group_visibility(self, ext):
+		""" Determines the visibility of the files with extension ext under the
+		current filter: True if all should be shown, False if all should be
+		hidden and None if this should be decided for each file separately """
+		if self._filter is None:
+			return True
+		if self._filter_extensions is None:
+			return None
+		return ext in self._filter_extensions
 
-		iterator = QtWidgets.QTreeWidgetItemIterator(self)
-		while(iterator.value()):
-			item = iterator.value()
-			item_data = item.data(0,QtCore.Qt.UserRole)
-			if item_data['id'] in self.expanded_items:
-				item.setExpanded(True)
-			# Reset selection to item that was selected before refresh
-			if self.previously_selected_item:
-				if self.previously_selected_item['id'] == item_data['id']:
-					self.setCurrentItem(item)
-			iterator += 1
+	def __file_visible(self, filename, group_visibility):
+		""" Checks if a file in a group with the specified visibility should be
+		shown """
+		if group_visibility is None:
+			return not self._filter_regex.match(filename) is None
+		return group_visibility
+
+	def _index_entry(self, entry, data, parent_id):
+		""" Adds a new entry to the indexes and applies the filter to it
+
+		Parameters
+		----------
+		entry : object
+			The entry to add (see the class docstring)
+		data : ItemRecord
+			The record of the entry
+		parent_id : str
+			The OSF id of the parent, or None for top level items
+		"""
+		self.item_index[data.id] = entry
+		self.search_index.add(data.id, data.name, parent_id)
+		if data.kind != "file":
+			return
+		ext = extension_key(data.name)
+		self.extension_index.setdefault(ext, {})[data.id] = entry
+		visibility = self.__group_visibility(ext)
+		self.extension_visibility[ext] = visibility
+		if not self.__file_visible(data.name, visibility):
+			self._set_entry_hidden(entry, True)
+
+	def _unindex_entry(self, entry, data):
+		""" Removes a single entry from the indexes """
+		if self.item_index.get(data.id) is entry:
+			del self.item_index[data.id]
+			self.search_index.remove(data.id)
+		if data.kind == "file":
+			ext = extension_key(data.name)
+			group = self.extension_index.get(ext, {})
+			group.pop(data.id, None)
+			if not group:
+				self.extension_index.pop(ext, None)
+				self.extension_visibility.pop(ext, None)
+
+	def _clear_indexes(self):
+		""" Empties the indexes, when the tree is cleared """
+		self.extension_index = {}
+		self.extension_visibility = {}
+		self.item_index = {}
+		self.search_index.clear()
+
+	def _refresh_error(self, reply):
+		""" Error callback for the request of the logged in user in
+		refresh_contents() """
+		self.refreshFinished.emit()
 
-		self.isRefreshing = False
 	### Properties
 
 	@property
@@ -1282,7 +1930,8 @@ class ProjectTree(QtWidgets.QTreeWidget):
 	@filter.setter
 	def filter(self, value):
 		""" Only shows tree items that match the specified file extension(s)
-		and hides the others
+		and hides the others. Items that are added later on are filtered as
+		they are added to the tree.
 
 		value : None, str or list
 			If None is passed, this clears the filter, making all items present
@@ -1303,43 +1952,25 @@ class ProjectTree(QtWidgets.QTreeWidget):
 
 		# Store the filter for later reference
 		self._filter = value
-
-		# Iterate over the items
-		iterator = QtWidgets.QTreeWidgetItemIterator(self)
-		while(iterator.value()):
-			item = iterator.value()
-			# Check if item is of type 'file'
-			# Filters are only applicable to files
-			item_type = item.data(1, QtCore.Qt.DisplayRole)
-			if item_type == "file":
-				# If filter is None, it means everything should be
-				# visible, so set this item to visible and continue.
-				if self._filter is None:
-					item.setHidden(False)
-					iterator += 1
-					continue
-
-				# Check if filter extension is contained in filename
-				item_data = item.data(0, QtCore.Qt.UserRole)
-				filename = item_data['attributes']['name']
-
-				# Assume no match by default
-				typematch = False
-				# If filter is a single string, just check directly
-				if isinstance(self._filter, basestring):
-					typematch = fnmatch.fnmatch(filename, self._filter)
-				# If filter is a list, compare to each item in it
-				if isinstance(self._filter, list):
-					for ext in self._filter:
-						if fnmatch.fnmatch(filename, ext):
-							typematch = True
-							break
-				# Set item's visibility according to value of typematch
-				if typematch:
-					item.setHidden(False)
-				else:
-					item.setHidden(True)
-			iterator += 1
+		if value is None:
+			self._filter_regex = None
+			self._filter_extensions = None
+		else:
+			self._filter_regex = compile_filter(value)
+			self._filter_extensions = filter_extensions(value)
+
+		# Filters are only applicable to files. Only the extension groups of
+		# which the visibility changes need to be visited; items that are
+		# added later on are filtered as they are added.
+		for ext, group in self.extension_index.items():
+			visibility = self.__group_visibility(ext)
+			if visibility == self.extension_visibility.get(ext) and \
+				not visibility is None:
+				continue
+			self.extension_visibility[ext] = visibility
+			for entry in group.values():
+				self._set_entry_hidden(entry, not self.__file_visible(
+					self._entry_record(entry).name, visibility))
 
 	### Public functions
 
@@ -1349,6 +1980,14 @@ class ProjectTree(QtWidgets.QTreeWidget):
 	def clear_filter(self):
 		self.filter = None
 
+	def current_record(self):
+		""" Returns the ItemRecord of the current item, or None if there is no
+		current item """
+		item = self.currentItem()
+		if item is None:
+			return None
+		return item.data(0, QtCore.Qt.UserRole)
+
 	def find_item(self, item, index, value):
 		"""
 		Checks if there is already a tree item with the same name as value. This
@@ -1357,10 +1996,11 @@ class ProjectTree(QtWidgets.QTreeWidget):
 
 		Parameters
 		----------
-		item : QtWidgets.QTreeWidgetItem
-			The tree widget item of which to search the direct descendents.
+		item : QtWidgets.QTreeWidgetItem or TreeViewItem
+			The tree item of which to search the direct descendents.
 		index : int
-			The column index of the tree widget item.
+			The column index of the tree widget item. Names (column 0) are
+			looked up in an index, other columns are compared one by one.
 		value : str
 			The value to search for
 
@@ -1368,18 +2008,91 @@ class ProjectTree(QtWidgets.QTreeWidget):
 		-------
 		int : The index position at which the item is found or None .
 		"""
-		child_count = item.childCount()
-		if not child_count:
+		if index != 0:
+			for i in range(item.childCount()):
+				if item.child(i).text(index) == value:
+					return i
 			return None
+		child = self.find_child(item, value)
+		if child is None:
+			return None
+		return item.indexOfChild(child)
 
-		for i in range(0,child_count):
-			child = item.child(i)
-			displaytext = child.data(0,QtCore.Qt.DisplayRole)
-			if displaytext == value:
-				return i
-		return None
+	def resolve_path(self, path, item=None):
+		""" Finds the item at the specified path, such as
+		osfstorage/data/sub01/run1.csv. Only items that are currently present
+		in the tree can be found.
 
-	def get_icon(self, datatype, name):
+		Parameters
+		----------
+		path : str
+			The names of the successive items, separated by slashes.
+		item : QtWidgets.QTreeWidgetItem or TreeViewItem (default: None)
+			The item the path is relative to, e.g. a project. If not specified,
+			the path should start with the name of a top level item.
+
+		Returns
+		-------
+		QtWidgets.QTreeWidgetItem or TreeViewItem : the item at path, or None
+		if it does not exist.
+		"""
+		if item is None:
+			item = self.invisibleRootItem()
+		for name in path.strip('/').split('/'):
+			item = self.find_child(item, name)
+			if item is None:
+				return None
+		return item
+
+	def search(self, query, limit=100):
+		""" Searches the items in the tree by name. If the query contains
+		slashes, it is matched against the path of the items (e.g.
+		osfstorage/data/run1.csv)
+
+		Parameters
+		----------
+		query : str
+			The (part of the) name or path to search for. Case insensitive.
+		limit : int (default: 100)
+			The maximum number of results to return
+
+		Returns
+		-------
+		list : the matching items, best matches first
+		"""
+		return [self._item_for_entry(self.item_index[key]) for key in
+			self.search_index.search(query, limit)]
+
+	def load_item_data(self, item, callback, *args, **kwargs):
+		""" Retrieves the full JSON representation of the node or file that
+		the item represents from the OSF. The tree items themselves only hold a
+		compact record with the fields that the widgets use.
+
+		Parameters
+		----------
+		item : QtWidgets.QTreeWidgetItem or TreeViewItem
+			The tree item to retrieve the full data for
+		callback : function
+			The callback function to which the reply should be delivered once
+			the request is finished
+		*args (optional)
+			Any other arguments that you want to have passed to the callback
+		**kwargs (optional)
+			Any other keywoard arguments that you want to have passed to the
+			callback
+
+		Returns
+		-------
+		QtNetwork.QNetworkReply or None if something went wrong
+		"""
+		data = item.data(0, QtCore.Qt.UserRole)
+		if not data.info_url:
+			raise osf.OSFInvalidResponse("No info url known for {}".format(
+				data.id))
+		return self.manager.get(data.info_url, callback, *args, **kwargs)
+
+	@staticmethod
+	def get_icon(datatype, name, filetype=None):
 		"""
 		Retrieves the curren theme icon for a certain object (project, folder)
 		or filetype. Uses the file extension to determine the file type.
@@ -1391,23 +2104,48 @@ class ProjectTree(QtWidgets.QTreeWidget):
 		name : string
 			The name of the object, which is the project's, folder's or
 			file's name
+		filetype : string (default: None)
+			The xdg type of the file, if it has been determined already (see
+			filetypes.determine_types())
 
 		Returns
 		-------
 		QtGui.QIcon : The icon for the current file/object type """
 
-		providers = {
-			'osfstorage'   : osf_logo_path,
-			'github'       : 'web-github',
-			'dropbox'      : 'dropbox',
-			'googledrive'  : 'web-google-drive',
-			'box'          : 'web-microsoft-onedrive',
-			'cloudfiles'   : 'web-microsoft-onedrive',
-			'dataverse'    : 'web-microsoft-onedrive',
-			'figshare'     : 'web-microsoft-onedrive',
-			's3'           : 'web-microsoft-onedrive',
-		}
+		global _icon_cache_theme
+
+		# Resolving an icon from a theme requires file system lookups, so
+		# the results are cached until the theme changes.
+		theme = (QtGui.QIcon.themeName(), tuple(QtGui.QIcon.themeSearchPaths()))
+		if theme != _icon_cache_theme:
+			_icon_cache.clear()
+			_icon_cache_theme = theme
 
+		if datatype in ['folder','folder-open']:
+			# Providers only differ from other folders by their name
+			key = (datatype, name if name in ProjectTreeMixin.providers else None)
+		elif datatype == 'file':
+			# check for OpenSesame extensions first. If this is not an OS file
+			# use fileinspector to determine the filetype
+			if check_if_opensesame_file(name):
+				filetype = 'opera-widget-manager'
+			elif filetype is None:
+				filetype = filetypes.determine_type(name,'xdg')
+			key = (datatype, filetype)
+		else:
+			key = (datatype, None)
+
+		icon = _icon_cache.get(key)
+		if icon is None:
+			icon = ProjectTreeMixin.__load_icon(*key)
+			_icon_cache[key] = icon
+		return icon
+
+	@staticmethod
+	def __load_icon(datatype, name):
+		""" Loads the icon for get_icon() from the current theme. For files,
+		name is the file type instead of the file name. """
+		providers = ProjectTreeMixin.providers
 		if datatype == 'project':
 			return QtGui.QIcon.fromTheme(
 				'gbrainy',
@@ -1428,15 +2166,8 @@ class ProjectTree(QtWidgets.QTreeWidget):
 					QtGui.QIcon(osf_logo_path)
 				)
 		elif datatype == 'file':
-			# check for OpenSesame extensions first. If this is not an OS file
-			# use fileinspector to determine the filetype
-			if check_if_opensesame_file(name):
-				filetype = 'opera-widget-manager'
-			else:
-				filetype = fileinspector.determine_type(name,'xdg')
-
 			return QtGui.QIcon.fromTheme(
-				filetype,
+				name,
 				QtGui.QIcon.fromTheme(
 					'text-x-generic',
 					QtGui.QIcon('osf_logo_path')
@@ -1453,11 +2184,7 @@ class ProjectTree(QtWidgets.QTreeWidget):
 		# Set flag that tree is currently refreshing
 		self.isRefreshing = True
 		# Save current item selection to restore it after refresh
-		current_item = self.currentItem()
-		if current_item:
-			self.previously_selected_item = current_item.data(0,QtCore.Qt.UserRole)
-		else:
-			self.previously_selected_item = None
+		self.previously_selected_item = self.current_record()
 
 		if self.manager.logged_in_user != {}:
 			# If manager has the data of the logged in user saved locally, pass it
@@ -1466,32 +2193,503 @@ class ProjectTree(QtWidgets.QTreeWidget):
 		else:
 			# If not, query the osf for the user data, and pass get_repo_contents
 			# ass the callback to which the received data should be sent.
-			self.manager.get_logged_in_user(
-				self.process_repo_contents, errorCallback=self.__populate_error)
+			if not self.manager.get_logged_in_user(
+				self.process_repo_contents, errorCallback=self._refresh_error):
+				# No request was issued (e.g. because there is no network
+				# access), so the refresh is over already
+				self.refreshFinished.emit()
+
+	def process_repo_contents(self, logged_in_user):
+		""" Processes contents for the logged in user. Starts by listing
+		the projects, after which their contents are retrieved (see
+		_populate()). """
+		# If this function is called as a callback, the supplied data will be a
+		# QByteArray. Convert to a dictionary for easier usage
+		if isinstance(logged_in_user, QtNetwork.QNetworkReply):
+			logged_in_user = self.manager.read_json(logged_in_user)
+
+		# Get url to user projects. Use that as entry point to populate the project tree
+		try:
+			user_nodes_api_call = logged_in_user['data']['relationships']['nodes']\
+			['links']['related']['href']
+		except (KeyError, TypeError) as e:
+			raise osf.OSFInvalidResponse(
+				"The structure of the retrieved data seems invalid: {}".format(e)
+			)
+		self._populate(user_nodes_api_call)
+
+	# Event handling functions required by EventDispatcher
+
+	def handle_login(self):
+		""" Callback function for EventDispatcher when a login event is detected """
+		self.refresh_contents()
+
+	def handle_logout(self):
+		""" Callback function for EventDispatcher when a logout event is detected """
+		self.previously_selected_item = None
+		self.isRefreshing = False
+		self.clear()
+
+class ProjectTree(ProjectTreeMixin, QtWidgets.QTreeWidget):
+	""" A tree representation of projects and files on the OSF for the current user
+	in a treeview widget"""
+
+	# Event fired when refresh of tree is finished
+	refreshFinished = QtCore.pyqtSignal()
+
+	# The time in ms that may be spent on inserting items into the tree in a
+	# single pass of the event loop, so that the GUI stays responsive while
+	# large listings are added.
+	insert_time_budget = 12
+	# The number of items to insert between checks of the time budget
+	insert_chunk_size = 25
+
+	def __init__(self, manager, use_theme=None, theme_path='./resources/iconthemes'):
+		""" Constructor
+		Creates a tree showing the contents of the user's OSF repositories.
+		Can be passed a theme to use for the icons, but if this doesn't happen
+		it will use the default qtawesome (FontAwesome) icons.
+
+		Parameters
+		----------
+		manager : manger.ConnectionManager
+			The object taking care of all the communication with the OSF
+		use_theme : string (default: None)
+			The name of the icon theme to use.
+		theme_path : The path to the folder at which the icon theme is located
+			Relevant only on Windows and OSX as the location of icon themes on
+			Linux is standardized.
+		"""
+		super(ProjectTree, self).__init__()
+		self._init_tree(manager, use_theme, theme_path)
+
+		# Set column labels
+		self.setHeaderLabels(["Name","Kind","Size"])
+		self.setColumnWidth(0,300)
+
+		# Event handling
+		self.itemExpanded.connect(self.__set_expanded_icon)
+		self.itemCollapsed.connect(self.__set_collapsed_icon)
+		self.refreshFinished.connect(self.__refresh_finished)
+
+		# Due to the recursive nature of the tree populating function, it is
+		# sometimes difficult to keep track of if the populating function is still
+		# active. This is a somewhat hacky attempt to artificially keep try to keep
+		# track, by adding current requests in this list.
+		self.active_requests = []
+
+		# Pages of received items that still have to be inserted into the tree.
+		# Each entry is a list with the parent item, the records of the items to
+		# add and the reply they were received with.
+		self.insert_queue = deque()
+		self.insert_timer = QtCore.QTimer(self)
+		self.insert_timer.setSingleShot(True)
+		self.insert_timer.setInterval(0)
+		self.insert_timer.timeout.connect(self.__process_insert_queue)
+		# The sorting state of the tree before insertion started, or None if
+		# sorting is not suspended
+		self.suspended_sorting = None
+		# The listings of the providers of projects that were embedded in the
+		# listing of the projects, by the OSF id of the project. Cleared if the
+		# OSF turns out not to support embedding them.
+		self.embedded_listings = {}
+		self.embed_files = True
+
+		# The children of each item by their name, stored by the OSF id of the
+		# parent (or None for the top level items). Siblings can have the same
+		# name (e.g. a component and a storage provider), so each name maps to
+		# a list of items.
+		self.child_index = {}
+
+	### Private functions
+
+	def _entry_record(self, item):
+		return item.data(0, QtCore.Qt.UserRole)
+
+	def _set_entry_hidden(self, item, hidden):
+		item.setHidden(hidden)
+
+	def _item_for_entry(self, item):
+		return item
+
+	def _populate(self, url):
+		# Clear the tree to be sure
+		self.clear()
+		# Start populating the tree. The storage providers of the projects are
+		# requested along with the projects themselves, which saves a request
+		# per project.
+		self.__request_listing(url,
+			embed="files" if self.embed_files else None)
+		# If no request was issued, the refresh is over already
+		self.__check_finished()
+
+	def __index_item(self, item, data, parent):
+		""" Adds a new item to the indexes of the tree and applies the filter
+		to it """
+		parent_data = parent.data(0, QtCore.Qt.UserRole)
+		parent_id = None if parent_data is None else parent_data.id
+		self.child_index.setdefault(parent_id, {}).setdefault(data.name,
+			[]).append(item)
+		self._index_entry(item, data, parent_id)
+
+	def __unindex_item(self, item):
+		""" Removes an item and all its descendants from the indexes of the
+		tree """
+		parent = item.parent()
+		parent_data = None if parent is None else \
+			parent.data(0, QtCore.Qt.UserRole)
+		siblings = self.child_index.get(
+			None if parent_data is None else parent_data.id, {})
+		data = item.data(0, QtCore.Qt.UserRole)
+		named = siblings.get(data.name, [])
+		if item in named:
+			named.remove(item)
+			if not named:
+				del siblings[data.name]
+
+		stack = [item]
+		while stack:
+			current = stack.pop()
+			data = current.data(0, QtCore.Qt.UserRole)
+			if self.item_index.get(data.id) is current:
+				self.child_index.pop(data.id, None)
+			self._unindex_entry(current, data)
+			stack.extend(current.child(i) for i in range(current.childCount()))
+
+	def __set_expanded_icon(self,item):
+		data = item.data(0, QtCore.Qt.UserRole)
+		if not data.is_node and data.kind == 'folder':
+			item.setIcon(0,self.get_icon('folder-open',data.name))
+		self.expanded_items.add(data.id)
+
+	def __set_collapsed_icon(self,item):
+		data = item.data(0, QtCore.Qt.UserRole)
+		if not data.is_node and data.kind == 'folder':
+			item.setIcon(0,self.get_icon('folder',data.name))
+		self.expanded_items.discard(data.id)
+
+	def __populate_error(self, reply):
+		""" Callback for when an error occured while populating the tree. """
+		# Reset active requests after error
+		self.__request_done(reply)
+		self.__check_finished()
+
+	def __request_done(self, reply):
+		""" Removes a reply from the active requests """
+		try:
+			self.active_requests.remove(reply)
+		except ValueError:
+			logging.info("Reply not found in active requests")
+
+	def __check_finished(self):
+		""" Emits refreshFinished if there are no more requests in progress
+		and all received items have been added to the tree """
+		if not self.active_requests and not self.insert_queue:
+			self.__resume_sorting()
+			self.refreshFinished.emit()
+
+	def __is_attached(self, item):
+		""" Checks if item is (still) part of the tree """
+		if item is self.invisibleRootItem():
+			return True
+		try:
+			data = item.data(0, QtCore.Qt.UserRole)
+		except RuntimeError:
+			# The underlying C++ object has been deleted by clear()
+			return False
+		return not data is None and self.item_index.get(data.id) is item
+
+	def __suspend_sorting(self):
+		""" Turns sorting off until the tree is completely populated, so that
+		it is not resorted after every single insertion. """
+		if self.suspended_sorting is None:
+			self.suspended_sorting = self.isSortingEnabled()
+			self.setSortingEnabled(False)
+
+	def __resume_sorting(self):
+		""" Restores the sorting state from before insertion started, which
+		sorts the whole tree once if sorting was enabled. """
+		if not self.suspended_sorting is None:
+			self.setSortingEnabled(self.suspended_sorting)
+			self.suspended_sorting = None
+
+	def __process_insert_queue(self):
+		""" Inserts queued items into the tree until the queue is empty or the
+		time budget for this pass of the event loop is used up. In the latter
+		case, processing is continued in the next pass. """
+		timer = QtCore.QElapsedTimer()
+		timer.start()
+		self.__suspend_sorting()
+		self.setUpdatesEnabled(False)
+
+		try:
+			while self.insert_queue and \
+				timer.elapsed() < self.insert_time_budget:
+				parent, records, reply = self.insert_queue[0]
+				# The parent may have been removed in the mean time
+				attached = self.__is_attached(parent)
+				if attached:
+					chunk = records[:self.insert_chunk_size]
+					del records[:self.insert_chunk_size]
+					for item, kind in self.add_items(parent, chunk):
+						if kind in ["project","folder"]:
+							self.__populate_children(item)
+				else:
+					del records[:]
+				if not records:
+					self.insert_queue.popleft()
+					self.__request_done(reply)
+					# Sort the children of the parent once the whole page has
+					# been added, instead of resorting the whole tree.
+					if attached and self.suspended_sorting:
+						parent.sortChildren(self.sortColumn(),
+							self.header().sortIndicatorOrder())
+		except Exception:
+			# Don't leave the tree frozen and unsorted if an item could not be
+			# added. The queue is dropped, as it is unclear what is left of it.
+			while self.insert_queue:
+				self.__request_done(self.insert_queue.popleft()[2])
+			self.__check_finished()
+			raise
+		finally:
+			self.setUpdatesEnabled(True)
+
+		if self.insert_queue:
+			self.insert_timer.start()
+		else:
+			self.__check_finished()
+
+	def __populate_children(self, item):
+		""" Requests the contents of a project or folder item and adds them
+		to the tree when they are received. """
+		data = item.data(0, QtCore.Qt.UserRole)
+		# The contents may have been received with the listing of the parent
+		# already. As there is no request for them, use a placeholder in
+		# active_requests until they are added to the tree.
+		listing = self.embedded_listings.pop(data.id, None)
+		if not listing is None:
+			placeholder = object()
+			self.active_requests.append(placeholder)
+			self.__queue_listing(item, listing, placeholder)
+			return
+		next_entrypoint = data.files_url
+		if not next_entrypoint:
+			raise osf.OSFInvalidResponse("Invalid api call for getting next"
+				" entry point for {}".format(data.id))
+		self.__request_listing(next_entrypoint, item)
+
+	def __request_listing(self, url, item=None, embed=None):
+		""" Requests a page of projects or files, of which the entries are added
+		as children of item (or at the top level if item is None). Only the
+		fields the tree uses are requested, and the first page of the embed
+		relationship of each entry (see osf.listing_url()). """
+		args = [] if item is None else [item]
+		url = osf.listing_url(url, embed)
+		req = self.manager.get(
+			url,
+			self.populate_tree,
+			*args,
+			errorCallback=lambda reply: self.__listing_error(reply, url, item),
+			parseJSON=True,
+			# Errors of requests with embedding are reported by
+			# __listing_error(), unless the request is retried without it
+			quiet=not osf.strip_embed(url) is None
+		)
+		# If something went wrong, req should be None
+		if req:
+			self.active_requests.append(req)
+
+	def __listing_error(self, reply, url, item):
+		""" Error callback for __request_listing(). If the request failed
+		because the OSF does not support embedding in it, it is repeated
+		without embedding. """
+		status = reply.attribute(QtNetwork.QNetworkRequest.HttpStatusCodeAttribute)
+		stripped = osf.strip_embed(url)
+		if status == 400 and not stripped is None:
+			logging.info("Embedding not supported, retrying {}".format(stripped))
+			self.embed_files = False
+			self.__request_listing(stripped, item)
+		elif not stripped is None and \
+			reply.error() != reply.OperationCanceledError:
+			self.manager.error_message.emit(str(status), reply.errorString())
+		self.__populate_error(reply)
+
+	def __queue_listing(self, parent, listing, request):
+		""" Queues the entries of a (page of a) listing to be added to the tree
+		as children of parent, and requests the next page of the listing if
+		there is one.
+
+		Parameters
+		----------
+		parent : QtWidgets.QTreeWidgetItem
+			The item to add the entries to
+		listing : dict
+			The JSON representation of the listing
+		request : object
+			The entry in active_requests that is removed once all entries have
+			been added
+		"""
+		# Listings that don't fit on a single page are continued on the next
+		next_url = listing.get("links", {}).get("next")
+		if next_url:
+			self.__request_listing(next_url,
+				None if parent is self.invisibleRootItem() else parent)
+
+		records = []
+		for entry in listing["data"]:
+			record = ItemRecord.from_json(entry)
+			embedded = osf.embedded_listing(entry, "files")
+			if not embedded is None:
+				self.embedded_listings[record.id] = embedded
+			records.append(record)
+		# The items are added in batches from the event loop, so that large
+		# pages do not freeze the GUI. The request is only considered finished
+		# once all its items have been added.
+		self.insert_queue.append([parent, records, request])
+		if not self.insert_timer.isActive():
+			self.insert_timer.start()
+
+	def __refresh_finished(self):
+		""" Expands all treewidget items again that were expanded before the
+		refresh. The items are looked up in the item index, so that only the
+		expanded items are visited instead of the whole tree. """
+		# Expanding an item adds it to expanded_items, so iterate over a copy
+		for item_id in list(self.expanded_items):
+			item = self.item_index.get(item_id)
+			if not item is None:
+				item.setExpanded(True)
+		# Reset selection to item that was selected before refresh
+		if self.previously_selected_item:
+			item = self.item_index.get(self.previously_selected_item.id)
+			if not item is None:
+				self.setCurrentItem(item)
+
+		self.isRefreshing = False
+
+	### Public functions
+
+	def find_child(self, item, name, kind=None):
+		""" Returns the direct child of item with the given name, or None if
+		item has no such child. If several children have this name, the first
+		one that was added is returned.
+
+		Parameters
+		----------
+		item : QtWidgets.QTreeWidgetItem
+			The tree widget item of which to search the direct descendents.
+		name : str
+			The name of the child
+		kind : str (default: None)
+			If specified, only a child of this kind (e.g. file or folder) is
+			returned
+
+		Returns
+		-------
+		QtWidgets.QTreeWidgetItem : the child item, or None
+		"""
+		data = item.data(0, QtCore.Qt.UserRole)
+		children = self.child_index.get(None if data is None else data.id)
+		if not children:
+			return None
+		for child in children.get(name, ()):
+			if kind is None or \
+				child.data(0, QtCore.Qt.UserRole).kind == kind:
+				return child
+		return None
 
 	def add_item(self, parent, data):
-		if data['type'] == 'nodes':
-			name = data["attributes"]["title"]
-			kind = data["attributes"]["category"]
-		if data['type'] == 'files':
-			name = data["attributes"]["name"]
-			kind = data["attributes"]["kind"]
+		""" Adds an item to the tree. Only a compact record of the passed data
+		is stored in the item (see records.ItemRecord); the full JSON
+		representation can be retrieved later with load_item_data().
 
-		values = [name, kind]
-		if "size" in data["attributes"] and data["attributes"]["size"]:
-			values += [humanize.naturalsize(data["attributes"]["size"])]
+		Parameters
+		----------
+		parent : QtWidgets.QTreeWidgetItem
+			The item to add the new item to.
+		data : dict or ItemRecord
+			The JSON representation of the node or file as received from the
+			OSF, or an already created record thereof.
+
+		Returns
+		-------
+		tuple : the newly created QTreeWidgetItem and the kind of the item
+		"""
+		data = ItemRecord.wrap(data)
+		item = self.__create_item(data)
+		parent.addChild(item)
+		# Index the item and apply the filter to it
+		self.__index_item(item, data, parent)
+		return item, data.kind
+
+	def add_items(self, parent, entries):
+		""" Adds several items to the same parent at once, which is
+		considerably faster than adding them one by one with add_item().
+
+		Parameters
+		----------
+		parent : QtWidgets.QTreeWidgetItem
+			The item to add the new items to.
+		entries : list
+			The JSON representations of the nodes or files, or records thereof
+
+		Returns
+		-------
+		list : tuples of the newly created QTreeWidgetItem and its kind
+		"""
+		records = [ItemRecord.wrap(data) for data in entries]
+		# Determine the types of all files in one go
+		types = filetypes.determine_types([data.name if data.kind == 'file'
+			else '' for data in records], 'xdg')
+		items = [self.__create_item(data, filetype) for data, filetype in
+			zip(records, types)]
+		parent.addChildren(items)
+		for item, data in zip(items, records):
+			self.__index_item(item, data, parent)
+		return [(item, data.kind) for item, data in zip(items, records)]
+
+	def __create_item(self, data, filetype=None):
+		""" Creates a (parentless) tree item for the record data. The type of
+		files can be passed as filetype if it is known already. """
+		values = [data.name, data.kind]
+		if data.size:
+			import humanize
+			values += [humanize.naturalsize(data.size)]
 
 		# Create item
-		item = QtWidgets.QTreeWidgetItem(parent, values)
+		item = QtWidgets.QTreeWidgetItem(values)
 
 		# Set icon
-		icon = self.get_icon(kind, name)
+		icon = self.get_icon(data.kind, data.name, filetype)
 		item.setIcon(0, icon)
 
 		# Add data
 		item.setData(0, QtCore.Qt.UserRole, data)
+		return item
 
-		return item, kind
+	def remove_item(self, item):
+		""" Removes an item (and all its children) from the tree.
+
+		Parameters
+		----------
+		item : QtWidgets.QTreeWidgetItem
+			The item to remove
+		"""
+		self.__unindex_item(item)
+		parent = item.parent()
+		if parent is None:
+			parent = self.invisibleRootItem()
+		parent.removeChild(item)
+
+	def clear(self):
+		""" Removes all items from the tree """
+		self._clear_indexes()
+		self.child_index = {}
+		# Pending insertions belong to the old contents
+		self.embedded_listings = {}
+		self.insert_queue.clear()
+		self.insert_timer.stop()
+		self.__resume_sorting()
+		super(ProjectTree, self).clear()
 
 	def populate_tree(self, reply, parent=None):
 		"""
@@ -1510,81 +2708,344 @@ class ProjectTree(QtWidgets.QTreeWidget):
 			Is mainly used for the recursiveness that this function implements.
 			If not specified the invisibleRootItem() is used as a parent.
 
-		Returns
-		-------
-		list : The list of tree items that have just been generated """
+		The items are not added right away, but in batches from the event loop
+		(see insert_time_budget), so refreshFinished is the signal to wait for.
+		"""
 
-		osf_response = json.loads(safe_decode(reply.readAll().data()))
+		osf_response = self.manager.read_json(reply)
 
 		if parent is None:
 			parent = self.invisibleRootItem()
-
-		for entry in osf_response["data"]:
-			# Add item to the tree
-			item, kind = self.add_item(parent, entry)
-
-			if kind in ["project","folder"]:
-				try:
-					next_entrypoint = entry['relationships']['files']\
-						['links']['related']['href']
-				except AttributeError as e:
-					raise osf.OSFInvalidResponse("Invalid api call for getting next"
-						"entry point: {}".format(e))
-				req = self.manager.get(
-					next_entrypoint,
-					self.populate_tree,
-					item,
-					errorCallback=self.__populate_error
-				)
-				# If something went wrong, req should be None
-				if req:
-					self.active_requests.append(req)
-
-		try:
-			self.active_requests.remove(reply)
-		except ValueError:
-			logging.info("Reply not found in active requests")
-
-		if not self.active_requests:
-			self.refreshFinished.emit()
-
-	def process_repo_contents(self, logged_in_user):
-		""" Processes contents for the logged in user. Starts by listing
-		the projects and then recurses through all their repositories, folders and files. """
-		# If this function is called as a callback, the supplied data will be a
-		# QByteArray. Convert to a dictionary for easier usage
-		if isinstance(logged_in_user, QtNetwork.QNetworkReply):
-			logged_in_user = json.loads(safe_decode(logged_in_user.readAll().data()))
-
-		# Get url to user projects. Use that as entry point to populate the project tree
-		try:
-			user_nodes_api_call = logged_in_user['data']['relationships']['nodes']\
-			['links']['related']['href']
-		except AttributeError as e:
-			raise osf.OSFInvalidResponse(
-				"The structure of the retrieved data seems invalid: {}".format(e)
-			)
-		# Clear the tree to be sure
-		self.clear()
-		# Start populating the tree
-		req = self.manager.get(
-			user_nodes_api_call,
-			self.populate_tree,
-			errorCallback=self.__populate_error,
-		)
-		# If something went wrong, req should be None
-		if req:
-			self.active_requests.append(req)
+		# Replies to requests made before the tree was cleared belong to items
+		# that no longer exist
+		if not self.__is_attached(parent):
+			self.__request_done(reply)
+			self.__check_finished()
+			return
+		self.__queue_listing(parent, osf_response, reply)
 
 	# Event handling functions required by EventDispatcher
 
 	def handle_login(self):
 		""" Callback function for EventDispatcher when a login event is detected """
 		self.active_requests = []
-		self.refresh_contents()
+		super(ProjectTree, self).handle_login()
 
 	def handle_logout(self):
 		""" Callback function for EventDispatcher when a logout event is detected """
 		self.active_requests = []
-		self.previously_selected_item = None
-		self.clear()
+		super(ProjectTree, self).handle_logout()
+
+class TreeViewItem(object):
+	""" A handle to an item of a ProjectTreeView, offering the part of the
+	QTreeWidgetItem interface that OSFExplorer and the other widgets use. This
+	allows them to work with both ProjectTree and ProjectTreeView. Handles are
+	created on demand, and compare equal if they refer to the same item. """
+
+	__slots__ = ('view', 'node')
+
+	def __init__(self, view, node):
+		""" Constructor
+
+		Parameters
+		----------
+		view : ProjectTreeView
+			The view the item is shown in
+		node : treemodel.TreeNode
+			The node of the item in the model of the view
+		"""
+		self.view = view
+		self.node = node
+
+	def __eq__(self, other):
+		return isinstance(other, TreeViewItem) and other.node is self.node
+
+	def __ne__(self, other):
+		return not self == other
+
+	def __hash__(self):
+		return hash(self.node)
+
+	def __check_attached(self):
+		""" Raises a RuntimeError if the item has been removed from the tree,
+		like a deleted QTreeWidgetItem does """
+		if not self.view.tree_model.is_attached(self.node):
+			raise RuntimeError("The item has been removed from the tree")
+
+	def model_index(self, column=0):
+		""" Returns the QModelIndex of the item """
+		self.__check_attached()
+		return self.view.tree_model.index_for_node(self.node, column)
+
+	def data(self, column, role):
+		return self.view.tree_model.data(self.model_index(column), role)
+
+	def text(self, column):
+		text = self.data(column, QtCore.Qt.DisplayRole)
+		return u'' if text is None else text
+
+	def parent(self):
+		""" Returns the parent item, or None for top level items """
+		self.__check_attached()
+		parent = self.node.parent
+		if parent is None or parent is self.view.tree_model.root:
+			return None
+		return TreeViewItem(self.view, parent)
+
+	def child(self, index):
+		if index < 0 or index >= len(self.node.children):
+			return None
+		return TreeViewItem(self.view, self.node.children[index])
+
+	def childCount(self):
+		return len(self.node.children)
+
+	def indexOfChild(self, child):
+		if not child.node.parent is self.node:
+			return -1
+		return child.node.row
+
+	def isHidden(self):
+		index = self.model_index()
+		return self.view.isRowHidden(index.row(), index.parent())
+
+	def setHidden(self, hidden):
+		index = self.model_index()
+		self.view.setRowHidden(index.row(), index.parent(), hidden)
+
+	def isExpanded(self):
+		return self.view.isExpanded(self.model_index())
+
+	def setExpanded(self, expanded):
+		self.view.setExpanded(self.model_index(), expanded)
+
+class ProjectTreeView(ProjectTreeMixin, QtWidgets.QTreeView):
+	""" A model/view based counterpart of ProjectTree, intended for accounts
+	with very large numbers of projects and files. The contents of projects and
+	folders are retrieved lazily (a page at a time) when they are expanded or
+	scrolled into view, and are stored in a compact node store instead of in
+	QTreeWidgetItems. The public API is that of ProjectTree, including the
+	signals of QTreeWidget that OSFExplorer uses; items are represented by
+	TreeViewItems. """
+
+	# Event fired when refresh of tree is finished
+	refreshFinished = QtCore.pyqtSignal()
+	# The signals of QTreeWidget, which pass TreeViewItems instead of
+	# QTreeWidgetItems
+	currentItemChanged = QtCore.pyqtSignal(object, object)
+	itemEntered = QtCore.pyqtSignal(object, int)
+	itemSelectionChanged = QtCore.pyqtSignal()
+
+	def __init__(self, manager, use_theme=None, theme_path='./resources/iconthemes'):
+		""" Constructor
+		Creates a tree showing the contents of the user's OSF repositories.
+		Can be passed a theme to use for the icons, but if this doesn't happen
+		it will use the default qtawesome (FontAwesome) icons.
+
+		Parameters
+		----------
+		manager : manger.ConnectionManager
+			The object taking care of all the communication with the OSF
+		use_theme : string (default: None)
+			The name of the icon theme to use.
+		theme_path : The path to the folder at which the icon theme is located
+			Relevant only on Windows and OSX as the location of icon themes on
+			Linux is standardized.
+		"""
+		super(ProjectTreeView, self).__init__()
+		self._init_tree(manager, use_theme, theme_path)
+
+		# Set up the model. All rows have the same height, which allows the
+		# view to skip measuring every single row.
+		self.tree_model = treemodel.ProjectTreeModel(manager,
+			icon_provider=self.get_icon, parent=self)
+		self.setModel(self.tree_model)
+		self.setUniformRowHeights(True)
+		self.setColumnWidth(0,300)
+
+		# Event handling
+		self.expanded.connect(self.__set_expanded)
+		self.collapsed.connect(self.__set_collapsed)
+		self.tree_model.rowsInserted.connect(self.__rows_inserted)
+		self.tree_model.modelReset.connect(self._clear_indexes)
+		self.tree_model.loadingFinished.connect(self.__loading_finished)
+		self.refreshFinished.connect(self.__refresh_finished)
+		self.verticalScrollBar().valueChanged.connect(self.__fetch_visible)
+		self.selectionModel().currentChanged.connect(self.__current_changed)
+		self.selectionModel().selectionChanged.connect(
+			self.itemSelectionChanged)
+		self.entered.connect(self.__entered)
+
+	### Private functions
+
+	def _entry_record(self, node):
+		return node.record
+
+	def _set_entry_hidden(self, node, hidden):
+		self.setRowHidden(node.row,
+			self.tree_model.index_for_node(node.parent), hidden)
+
+	def _item_for_entry(self, node):
+		return TreeViewItem(self, node)
+
+	def _populate(self, url):
+		# The storage providers of the projects are retrieved along with the
+		# projects themselves, which saves a request per project. The contents
+		# of the projects are retrieved once they are expanded.
+		self.tree_model.set_root_url(url, embed="files")
+		# If no request was issued, loadingFinished won't be emitted
+		if not self.tree_model.active_requests:
+			self.refreshFinished.emit()
+
+	def __item(self, index):
+		""" Returns the TreeViewItem for index, or None if it is invalid """
+		if not index.isValid():
+			return None
+		return TreeViewItem(self, self.tree_model.node(index))
+
+	def __current_changed(self, current, previous):
+		self.currentItemChanged.emit(self.__item(current),
+			self.__item(previous))
+
+	def __entered(self, index):
+		self.itemEntered.emit(self.__item(index), index.column())
+
+	def __set_expanded(self, index):
+		self.tree_model.set_expanded(index, True)
+		self.expanded_items.add(self.tree_model.record(index).id)
+		# The view only fetches the contents of expanded items itself once it
+		# has been laid out, so make sure they are retrieved in any case.
+		if self.tree_model.canFetchMore(index):
+			self.tree_model.fetchMore(index)
+
+	def __set_collapsed(self, index):
+		self.tree_model.set_expanded(index, False)
+		self.expanded_items.discard(self.tree_model.record(index).id)
+
+	def __rows_inserted(self, parent, first, last):
+		""" Adds newly inserted rows to the indexes of the tree, which also
+		applies the filter to them, and restores their expansion and selection
+		state from before a refresh. """
+		parent_node = self.tree_model.node(parent)
+		parent_id = None if parent_node.record is None else \
+			parent_node.record.id
+		new_nodes = parent_node.children[first:last+1]
+		for node in new_nodes:
+			self._index_entry(node, node.record, parent_id)
+		if not self.expanded_items and not self.previously_selected_item:
+			return
+		for node in new_nodes:
+			record = node.record
+			if record.id in self.expanded_items:
+				# Expanding triggers fetchMore(), so the expansion state of the
+				# rest of the tree is restored as its contents come in.
+				self.setExpanded(self.tree_model.index_for_node(node), True)
+			if self.previously_selected_item and \
+				self.previously_selected_item.id == record.id:
+				self.setCurrentIndex(self.tree_model.index_for_node(node))
+
+	def __fetch_visible(self, *args):
+		""" Retrieves the next page of children of the item at the bottom of the
+		viewport, if the end of its currently retrieved children is in view. """
+		index = self.indexAt(self.viewport().rect().bottomLeft())
+		if not index.isValid():
+			return
+		parent = index.parent()
+		if index.row() == self.tree_model.rowCount(parent) - 1 and \
+			self.tree_model.canFetchMore(parent):
+			self.tree_model.fetchMore(parent)
+
+	def __loading_finished(self):
+		""" Slot for the loadingFinished signal of the model, which is also
+		emitted after pages fetched by scrolling or expanding. Only the end of
+		a refresh is passed on as refreshFinished. """
+		if self.isRefreshing:
+			self.refreshFinished.emit()
+
+	def __refresh_finished(self):
+		self.isRefreshing = False
+
+	### Public functions
+
+	def currentItem(self):
+		return self.__item(self.currentIndex())
+
+	def setCurrentItem(self, item):
+		self.setCurrentIndex(item.model_index())
+
+	def scrollToItem(self, item):
+		""" Scrolls to item, expanding its parents if necessary """
+		self.scrollTo(item.model_index())
+
+	def itemAt(self, pos):
+		return self.__item(self.indexAt(pos))
+
+	def selectedItems(self):
+		return [self.__item(index) for index in
+			self.selectionModel().selectedRows()]
+
+	def invisibleRootItem(self):
+		return TreeViewItem(self, self.tree_model.root)
+
+	def sortItems(self, column, order):
+		self.sortByColumn(column, order)
+
+	def find_child(self, item, name, kind=None):
+		""" Returns the direct child of item with the given name, or None if
+		item has no such child. If several children have this name, the first
+		one that was added is returned.
+
+		Parameters
+		----------
+		item : TreeViewItem
+			The item of which to search the direct descendents.
+		name : str
+			The name of the child
+		kind : str (default: None)
+			If specified, only a child of this kind (e.g. file or folder) is
+			returned
+
+		Returns
+		-------
+		TreeViewItem : the child item, or None
+		"""
+		child = item.node.child_named(name, kind)
+		if child is None:
+			return None
+		return TreeViewItem(self, child)
+
+	def add_item(self, parent, data):
+		""" Adds an item below parent, for instance after a file has been
+		uploaded.
+
+		Parameters
+		----------
+		parent : TreeViewItem
+			The item to add the new item to.
+		data : dict or ItemRecord
+			The JSON representation of the node or file as received from the
+			OSF, or an already created record thereof.
+
+		Returns
+		-------
+		tuple : the newly created TreeViewItem and the kind of the item
+		"""
+		index = self.tree_model.add_record(parent.model_index(), data)
+		return self.__item(index), self.tree_model.record(index).kind
+
+	def remove_item(self, item):
+		""" Removes an item (and all its children) from the tree.
+
+		Parameters
+		----------
+		item : TreeViewItem
+			The item to remove
+		"""
+		node = item.node
+		for current in [node] + list(self.tree_model.iter_nodes(node)):
+			self._unindex_entry(current, current.record)
+		self.tree_model.remove_item(item.model_index())
+
+	def clear(self):
+		""" Removes all items from the tree """
+		self.tree_model.clear()
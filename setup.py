@@ -29,7 +29,18 @@ setup(
 		'python-fileinspector',
 		'requests_oauthlib',
 		'qtawesome',
+		# concurrent.futures for Python 2
+		'futures; python_version < "3"',
 	],
+	extras_require={
+		# Faster parsing of API responses
+		'fast-json': ['orjson'],
+		# The asyncio client (Python 3.6+)
+		'async': ['aiohttp'],
+	},
+	entry_points={
+		'console_scripts': ['qosf=QOpenScienceFramework.cli:main'],
+	},
 	include_package_data=True,
 	packages = ['QOpenScienceFramework'],
 	)